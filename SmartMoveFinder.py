@@ -1,68 +1,88 @@
+import concurrent.futures
+import os
 import random
-
-pieceScore = {"K" : 0, "Q" : 10, "R" : 5, "B" : 3, "N" : 3, "p" : 1}
-
-knightScores = [[1, 1, 1, 1, 1, 1, 1, 1],
-                [1, 2, 2, 2, 2, 2, 2, 1],
-                [1, 2, 3, 3, 3, 3, 2, 1],
-                [1, 2, 3, 4, 4, 3, 2, 1],
-                [1, 2, 3, 4, 4, 3, 2, 1],
-                [1, 2, 3, 3, 3, 3, 2, 1],
-                [1, 2, 2, 2, 2, 2, 2, 1],
-                [1, 1, 1, 1, 1, 1, 1, 1]]
-
-BishopScores = [[4, 3, 2, 1, 1, 2, 3, 4],
-                [3, 4, 3, 2, 2, 3, 4, 3],
-                [2, 3, 4, 3, 3, 4, 3, 2],
-                [1, 2, 3, 4, 4, 3, 2, 1],
-                [1, 2, 3, 4, 4, 3, 2, 1],
-                [2, 3, 4, 3, 3, 4, 3, 2],
-                [3, 4, 3, 2, 2, 3, 4, 3],
-                [4, 3, 2, 1, 1, 2, 3, 4]]
-
-QueenScores = [ [1, 1, 1, 3, 1, 1, 1, 1],
-                [1, 2, 3, 3, 3, 1, 1, 1],
-                [1, 4, 3, 3, 3, 4, 2, 1],
-                [1, 2, 3, 3, 3, 2, 2, 1],
-                [1, 2, 3, 3, 3, 2, 2, 1],
-                [1, 4, 3, 3, 3, 4, 2, 1],
-                [1, 1, 2, 3, 3, 1, 1, 1],
-                [1, 1, 1, 3, 1, 1, 1, 1]]
-
-RookScores = [  [4, 3, 4, 4, 4, 4, 3, 4],
-                [4, 4, 4, 4, 4, 4, 4, 4],
-                [1, 1, 2, 3, 3, 2, 1, 1],
-                [1, 2, 3, 4, 4, 3, 2, 1],
-                [1, 2, 3, 4, 4, 3, 2, 1],
-                [1, 1, 2, 3, 3, 2, 1, 1],
-                [4, 4, 4, 4, 4, 4, 4, 4],
-                [4, 3, 4, 4, 4, 4, 3, 4]]
-
-whitePawnScores = [[8, 8, 8, 8, 8, 8, 8, 8],
-                   [8, 8, 8, 8, 8, 8, 8, 8],
-                   [5, 6, 6, 7, 7, 6, 6, 5],
-                   [2, 3, 3, 5, 5, 3, 3, 2],
-                   [1, 2, 3, 4, 4, 3, 2, 1],
-                   [1, 1, 2, 3, 3, 2, 1, 1],
-                   [1, 1, 1, 0, 0, 1, 1, 1],
-                   [0, 0, 0, 0, 0, 0, 0, 0]]
-
-blackPawnScores = [[0, 0, 0, 0, 0, 0, 0, 0],
-                   [1, 1, 1, 0, 0, 1, 1, 1],
-                   [1, 1, 2, 3, 3, 2, 1, 1],
-                   [1, 2, 3, 4, 4, 3, 2, 1],
-                   [2, 3, 3, 5, 5, 3, 3, 2],
-                   [5, 6, 6, 7, 7, 6, 6, 5],
-                   [8, 8, 8, 8, 8, 8, 8, 8],
-                   [8, 8, 8, 8, 8, 8, 8, 8]]
-
-piecePositionScores = {"N" : knightScores, "B" : BishopScores, "R" : RookScores, "Q" : QueenScores, "bp" : blackPawnScores,
-                        "wp" : whitePawnScores}
-
-
-CHECKMATE = 1000
+import threading
+import time
+from chess_engine import pieceScore, pieceValues
+from opening_book import OpeningBook
+from search_stats import SearchStats, PhaseTimer
+from transposition_table import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+
+# scores are in centipawns, a pawn is worth 100
+CHECKMATE = 100000
 STALEMATE = 0
 DEPTH = 3
+TT_SIZE_MB = 16         # memory used by the transposition table
+TIME_LIMIT_MS = 2000    # time the iterative deepening search may take for a move
+MAX_DEPTH = 64
+PARALLEL_WORKERS = os.cpu_count() or 1    # processes used by findBestMoveParallel
+DELTA_MARGIN = 200      # a capture that can't lift the score to within this of alpha is skipped in quiescence
+PVS = True              # principal variation search: every move after the first is only tried with a null window
+ASPIRATION_WINDOW = 50  # iterative deepening searches this far around the score of the previous depth, 0 for off
+NULL_MOVE = True        # null move pruning
+NULL_MOVE_MIN_DEPTH = 2     # the null move is only tried this deep or deeper
+NULL_MOVE_REDUCTION = 2     # the null move is searched this much shallower than a real move,
+NULL_MOVE_DEEP_REDUCTION = 3    # and this much shallower from depth 6 on
+NULL_MOVE_QUIESCENCE_MARGIN = 300   # how far the score must be above beta to pass straight into quiescence
+LMR = True              # late move reductions
+LMR_MIN_DEPTH = 3       # moves are only reduced this deep or deeper
+LMR_MOVES = 3           # the first moves searched of every position aren't reduced
+TIME_PHASES = False     # time getValidMoves, makeMove and scoreBoard in searchStats, makes the search slower
+PHASES = ("getValidMoves", "getValidCaptures", "makeMove", "undoMove")     # GameState methods that are timed
+BOOK_FILE = "book.bin"  # opening book loaded by loadOpeningBook, build it with opening_book.py
+
+searchDepth = DEPTH     # depth of the root of the search that is running
+searchDeadline = None   # perf_counter time at which an iterative deepening search must stop
+searchNodeLimit = None  # node count at which it must stop
+searchStop = threading.Event()      # set from another thread to stop the running search
+counter = 0             # nodes of the main search
+quiescenceCounter = 0   # nodes of the quiescence search, leaves of the main search included
+betaCutoffs = 0         # beta cutoffs of the main search
+firstMoveCutoffs = 0    # beta cutoffs on the first move searched
+researches = 0          # PVS moves that beat the null window and were searched again
+nullMoveCutoffs = 0     # positions cut off by a null move
+reductionResearches = 0     # reduced moves that beat alpha and were searched again to the full depth
+searchStats = SearchStats()     # what the last search did, every search makes a new one
+
+killerMoves = [[0, 0] for ply in range(MAX_DEPTH + 1)]     # moveIDs of two quiet moves per ply that caused a cutoff
+historyScores = {}      # moveID of a quiet move: how much it has caused cutoffs, deeper cutoffs count more
+attackerOrder = {"p": 1, "N": 2, "B": 3, "R": 4, "Q": 5, "K": 6}     # least valuable attacker first
+
+transpositionTable = TranspositionTable(TT_SIZE_MB)
+searchPool = None       # process pool of the parallel search, started on first use
+searchPoolWorkers = 0
+parallelSearchID = 0    # goes up with every parallel search, so a worker knows when its tables are stale
+openingBook = None      # OpeningBook consulted by findBookMove, None when there is no book
+
+'''
+replaces the transposition table by an empty one of the given size
+'''
+
+def setTranspositionTableSize(sizeMB):
+    global transpositionTable
+    transpositionTable = TranspositionTable(sizeMB)
+
+'''
+opens the opening book at path for findBookMove. without a book file there is no book, a file that isn't a
+book raises ValueError
+'''
+
+def loadOpeningBook(path=BOOK_FILE):
+    global openingBook
+    if openingBook is not None:
+        openingBook.close()
+    openingBook = OpeningBook(path) if os.path.exists(path) else None
+    return openingBook
+
+'''
+a move from the opening book, None when there is no book or the position isn't in it. meant to be tried
+before searching
+'''
+
+def findBookMove(gs, validMoves):
+    if openingBook is None:
+        return None
+    return openingBook.getMove(gs, validMoves)
 
 '''
 picks and returns a random move
@@ -71,19 +91,268 @@ picks and returns a random move
 def findRandomMove(validMoves):
     return validMoves[random.randint(0, len(validMoves) -1)]
 
+'''
+resets the counters and the move ordering for a new search of the given depth and starts a new searchStats
+'''
+
+def startSearch(depth):
+    global counter, quiescenceCounter, betaCutoffs, firstMoveCutoffs, researches, nullMoveCutoffs, reductionResearches
+    global searchDepth, searchStats
+    counter = 0
+    quiescenceCounter = 0
+    betaCutoffs = 0
+    firstMoveCutoffs = 0
+    researches = 0
+    nullMoveCutoffs = 0
+    reductionResearches = 0
+    searchDepth = depth
+    transpositionTable.resetStats()
+    clearMoveOrdering()
+    searchStats = SearchStats()
+
+'''
+copies the counters into searchStats, depth is the deepest depth searched completely so far
+'''
+
+def updateSearchStats(depth):
+    searchStats.depth = depth
+    searchStats.nodes = counter
+    searchStats.quiescenceNodes = quiescenceCounter
+    searchStats.betaCutoffs = betaCutoffs
+    searchStats.firstMoveCutoffs = firstMoveCutoffs
+    searchStats.researches = researches
+    searchStats.nullMoveCutoffs = nullMoveCutoffs
+    searchStats.reductionResearches = reductionResearches
+    searchStats.ttHits = transpositionTable.hits
+    searchStats.ttMisses = transpositionTable.misses
+    searchStats.ttCollisions = transpositionTable.collisions
+    searchStats.ttProbes = transpositionTable.hits + transpositionTable.misses
+    searchStats.seconds = time.perf_counter() - searchStats.startTime
+
+'''
+adds a search to depth that finished, with the score (for the side to move) and move it found, to searchStats
+'''
+
+def recordIteration(depth, score, move):
+    updateSearchStats(depth)
+    searchStats.iterations.append({"depth": depth, "score": score, "move": move, "seconds": searchStats.seconds,
+                                   "nodes": counter - sum(iteration["nodes"] for iteration in searchStats.iterations),
+                                   "quiescenceNodes": quiescenceCounter - sum(iteration["quiescenceNodes"] for iteration in searchStats.iterations)})
+
+'''
+when TIME_PHASES is on, wraps the PHASES methods of gs and scoreBoard so the time spent in them adds up in
+searchStats.phaseSeconds. stopPhaseTimers must be called before gs is used for anything else
+'''
+
+def startPhaseTimers(gs):
+    global scoreBoard
+    if not TIME_PHASES:
+        return
+    timer = PhaseTimer(searchStats.phaseSeconds)
+    for name in PHASES:
+        setattr(gs, name, timer.wrap(name, getattr(gs, name)))
+    scoreBoard = timer.wrap("scoreBoard", scoreBoard)
+
+def stopPhaseTimers(gs):
+    global scoreBoard
+    for name in PHASES:
+        gs.__dict__.pop(name, None)
+    while hasattr(scoreBoard, "__wrapped__"):
+        scoreBoard = scoreBoard.__wrapped__
+
 '''
 Helper method to make the first recursive call
 '''
 def findBestMoveNegaMax(gs, validMoves):
-    global nextMove, counter
+    global nextMove
     nextMove = None
     random.shuffle(validMoves)
-    counter = 0
-    #findMoveNegaMax(gs, validMoves, DEPTH, 1 if gs.whiteToMove else -1)
-    findMoveNegaMaxAlphaBeta(gs, validMoves, DEPTH, -CHECKMATE, CHECKMATE, 1 if gs.whiteToMove else -1)
-    print(counter)
+    startSearch(DEPTH)
+    startPhaseTimers(gs)
+    try:
+        #findMoveNegaMax(gs, validMoves, DEPTH, 1 if gs.whiteToMove else -1)
+        score = findMoveNegaMaxAlphaBeta(gs, validMoves, DEPTH, -CHECKMATE, CHECKMATE, 1 if gs.whiteToMove else -1)
+    finally:
+        stopPhaseTimers(gs)
+    recordIteration(DEPTH, score, nextMove)
+    print(searchStats.getText())
     return nextMove
 
+'''
+raised inside the search when the time or node budget of an iterative deepening search runs out
+'''
+
+class SearchTimeout(Exception):
+    pass
+
+'''
+Iterative deepening: search depth 1, 2, 3 ... until the time (milliseconds) or node budget is used up and return
+the best move of the deepest search that finished. every iteration searches the previous best move first.
+onIteration(searchStats) is called after every depth that finished, searchStats.iterations[-1] is that depth
+'''
+def findBestMoveIterative(gs, validMoves, timeLimitMs=TIME_LIMIT_MS, nodeLimit=None, maxDepth=MAX_DEPTH, onIteration=None):
+    global nextMove, searchDepth, searchDeadline, searchNodeLimit
+    random.shuffle(validMoves)
+    startSearch(1)
+    startTime = searchStats.startTime
+    searchDeadline = None
+    searchNodeLimit = None
+    movesMade = len(gs.moveLog)
+    bestMove = None
+    completedDepth = 0
+    for depth in range(1, maxDepth + 1):
+        searchDepth = depth
+        nextMove = None
+        startPhaseTimers(gs)
+        try:
+            if ASPIRATION_WINDOW and completedDepth > 0:
+                score = searchAspirationWindow(gs, validMoves, depth, score)
+            else:
+                score = findMoveNegaMaxAlphaBeta(gs, validMoves, depth, -CHECKMATE, CHECKMATE, 1 if gs.whiteToMove else -1)
+        except SearchTimeout:
+            while len(gs.moveLog) > movesMade:     # the search was stopped in the middle of the tree
+                if gs.moveLog[-1] is None:
+                    gs.undoNullMove()
+                else:
+                    gs.undoMove()
+            break
+        finally:
+            stopPhaseTimers(gs)
+        bestMove = nextMove
+        completedDepth = depth
+        recordIteration(depth, score, bestMove)
+        if onIteration is not None:
+            onIteration(searchStats)
+        if bestMove is None or abs(score) >= CHECKMATE:   # no moves or a forced mate, searching deeper won't help
+            break
+        validMoves.remove(bestMove)
+        validMoves.insert(0, bestMove)
+        # the budgets only start counting once there is a move to fall back on
+        if timeLimitMs is not None:
+            searchDeadline = startTime + timeLimitMs / 1000
+            if time.perf_counter() >= searchDeadline:
+                break
+        if nodeLimit is not None:
+            searchNodeLimit = nodeLimit
+            if counter + quiescenceCounter >= nodeLimit:
+                break
+    searchDeadline = None
+    searchNodeLimit = None
+    updateSearchStats(completedDepth)
+    print(searchStats.getText())
+    return bestMove
+
+'''
+Aspiration window: searches the root with a window of ASPIRATION_WINDOW around the score of the previous depth,
+which cuts off more than the full window does. when the score falls outside, the window is made twice as wide
+on that side and the root is searched again, until the score is inside it
+'''
+def searchAspirationWindow(gs, validMoves, depth, previousScore):
+    window = ASPIRATION_WINDOW
+    alpha = max(previousScore - window, -CHECKMATE)
+    beta = min(previousScore + window, CHECKMATE)
+    while True:
+        score = findMoveNegaMaxAlphaBeta(gs, validMoves, depth, alpha, beta, 1 if gs.whiteToMove else -1)
+        if score <= alpha and alpha > -CHECKMATE:
+            window *= 2
+            alpha = max(previousScore - window, -CHECKMATE)
+        elif score >= beta and beta < CHECKMATE:
+            window *= 2
+            beta = min(previousScore + window, CHECKMATE)
+        else:
+            return score
+        searchStats.aspirationResearches += 1
+
+'''
+Parallel search at the root: the first root move (the best one by move ordering) is searched here to get a score
+to beat, then the other root moves are searched by a pool of processes with a null window around that score.
+a move that turns out to be better is searched again by its worker for the exact score. only as many moves as
+there are workers are out at a time, every later one gets the best score found so far. every process has its
+own transposition table, emptied when a new search reaches it, so the parallel search visits more nodes than
+the single process one at the same depth. the nodes and cutoffs of the workers are added to searchStats, the
+phases aren't timed
+'''
+def findBestMoveParallel(gs, validMoves, depth=DEPTH, workers=PARALLEL_WORKERS):
+    global nextMove, counter, quiescenceCounter, betaCutoffs, firstMoveCutoffs, parallelSearchID
+    random.shuffle(validMoves)
+    startSearch(depth)
+    if not validMoves:
+        nextMove = None
+        return None
+
+    entry = transpositionTable.probe(gs.zobristKey)
+    rootMoves = list(orderMoves(validMoves, entry[3] if entry else 0, 0))
+    bestMove = rootMoves[0]
+    bestScore = searchRootMove(gs, bestMove, depth, -CHECKMATE, CHECKMATE)
+    parallelSearchID += 1
+    pool = getSearchPool(workers)
+    waiting = rootMoves[:0:-1]     # popped from the end, so in move order
+    running = {}
+    while waiting or running:
+        while waiting and len(running) < workers:
+            move = waiting.pop()
+            running[pool.submit(searchRootMoveInWorker, gs, move, depth, bestScore, parallelSearchID)] = move
+        done, notDone = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            move = running.pop(future)
+            score, nodes, quiescenceNodes, cutoffs, firstMoves = future.result()
+            counter += nodes
+            quiescenceCounter += quiescenceNodes
+            betaCutoffs += cutoffs
+            firstMoveCutoffs += firstMoves
+            if score > bestScore:
+                bestScore = score
+                bestMove = move
+    transpositionTable.store(gs.zobristKey, depth, EXACT, bestScore, bestMove.moveID)
+    nextMove = bestMove
+    recordIteration(depth, bestScore, bestMove)
+    print(searchStats.getText() + " workers: " + str(workers))
+    return bestMove
+
+'''
+the pool is kept between searches, starting processes takes longer than a shallow search
+'''
+def getSearchPool(workers):
+    global searchPool, searchPoolWorkers
+    if searchPool is None or searchPoolWorkers != workers:
+        if searchPool is not None:
+            searchPool.shutdown()
+        searchPool = concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=setTranspositionTableSize,
+                                                            initargs=(TT_SIZE_MB,))
+        searchPoolWorkers = workers
+    return searchPool
+
+'''
+score of a root move for the side to move, searched depth - 1 plies further with the window (alpha, beta)
+'''
+def searchRootMove(gs, move, depth, alpha, beta):
+    gs.makeMove(move)
+    nextMoves = gs.getValidMoves() if depth > 1 else None
+    score = - findMoveNegaMaxAlphaBeta(gs, nextMoves, depth - 1, -beta, -alpha, 1 if gs.whiteToMove else -1, 1)
+    gs.undoMove()
+    return score
+
+'''
+runs in a worker process of the parallel search. returns the exact score of the move if it beats alpha (an
+upper bound otherwise) and the nodes and cutoffs it took. killers and history start afresh for every move, the
+transposition table for every search
+'''
+def searchRootMoveInWorker(gs, move, depth, alpha, searchID):
+    global counter, quiescenceCounter, betaCutoffs, firstMoveCutoffs, searchDepth, parallelSearchID
+    if searchID != parallelSearchID:
+        setTranspositionTableSize(TT_SIZE_MB)
+        parallelSearchID = searchID
+    clearMoveOrdering()
+    counter = 0
+    quiescenceCounter = 0
+    betaCutoffs = 0
+    firstMoveCutoffs = 0
+    searchDepth = depth
+    score = searchRootMove(gs, move, depth, alpha, alpha + 1)
+    if score > alpha:
+        score = searchRootMove(gs, move, depth, alpha, CHECKMATE)
+    return score, counter, quiescenceCounter, betaCutoffs, firstMoveCutoffs
+
 def findMoveMinMax(gs, validMoves, depth, whiteToMove):
     global nextMove
     if depth == 0:
@@ -134,62 +403,246 @@ def findMoveNegaMax(gs, validMoves, depth, turnMultiplier):
 
     return maxScore
 
-def findMoveNegaMaxAlphaBeta(gs, validMoves, depth, alpha, beta, turnMultiplier):
-    global nextMove, counter
-    counter += 1
-    if depth == 0:
-        return turnMultiplier * scoreBoard(gs)
+'''
+forget the killer moves and history scores of the previous search
+'''
+def clearMoveOrdering():
+    for killers in killerMoves:
+        killers[0] = killers[1] = 0
+    historyScores.clear()
 
-    # move ordering - implement this later
-    maxScore = -CHECKMATE
+'''
+MVV-LVA: most valuable victim first, and for the same victim the least valuable attacker first.
+promotions count as capturing the new piece
+'''
+def captureOrderScore(move):
+    score = 0
+    if move.pieceCaptured != "--":
+        score += 10 * pieceScore[move.pieceCaptured[1]] - attackerOrder[move.pieceMoved[1]]
+    if move.isPawnPromotion:
+        score += 10 * pieceScore[move.promotionChoice]
+    return score
+
+'''
+Yields the moves in the order they should be searched: the hash move, captures and promotions by MVV-LVA,
+the killer moves of this ply, then the quiet moves by history score. every stage is only sorted when the
+search gets to it, so a cutoff on a capture means the quiet moves are never sorted at all
+'''
+def orderMoves(validMoves, hashMoveID, ply):
+    hashMove = None
+    captures = []
+    quietMoves = []
     for move in validMoves:
+        if move.moveID == hashMoveID:
+            hashMove = move
+        elif move.pieceCaptured != "--" or move.isPawnPromotion:
+            captures.append(move)
+        else:
+            quietMoves.append(move)
+    if hashMove is not None:
+        yield hashMove
+
+    captures.sort(key=captureOrderScore, reverse=True)
+    yield from captures
+
+    killers = killerMoves[ply]
+    for killerID in killers:
+        for i in range(len(quietMoves)):
+            if killerID and quietMoves[i].moveID == killerID:
+                yield quietMoves.pop(i)
+                break
+
+    quietMoves.sort(key=lambda move: historyScores.get(move.moveID, 0), reverse=True)
+    yield from quietMoves
+
+'''
+remember a quiet move that caused a beta cutoff
+'''
+def storeCutoffMove(move, depth, ply):
+    if move.pieceCaptured != "--" or move.isPawnPromotion:
+        return
+    killers = killerMoves[ply]
+    if killers[0] != move.moveID:
+        killers[1] = killers[0]
+        killers[0] = move.moveID
+    historyScores[move.moveID] = historyScores.get(move.moveID, 0) + depth * depth
+
+'''
+stops the search with SearchTimeout once the time or node budget is used up or searchStop is set. the moves the
+search was in the middle of are not undone (findBestMoveIterative does that), so stopping from another thread is
+meant for searches running on a copy of the game
+'''
+def checkSearchLimits():
+    if searchStop.is_set() or (searchDeadline is not None and time.perf_counter() >= searchDeadline) or \
+            (searchNodeLimit is not None and counter + quiescenceCounter >= searchNodeLimit):
+        raise SearchTimeout()
+
+'''
+Quiescence search: at the end of the main search keep playing captures until the position is quiet, so a
+capture just beyond the horizon isn't missed. the side to move may also stand pat on the current score,
+except when in check: then every evasion is searched, quiet ones too, and none at all is a mate
+'''
+def quiescence(gs, alpha, beta, turnMultiplier, ply):
+    global quiescenceCounter
+    quiescenceCounter += 1
+    if quiescenceCounter % 32 == 0:
+        checkSearchLimits()
+    inCheck, captures = gs.getValidCaptures()    # every legal move when in check
+    if inCheck:
+        # no standing pat in check, the score is that of the best evasion or a mate when there is none
+        if not captures:
+            return -CHECKMATE
+        if gs.isRepetition():   # checks given back and forth
+            return STALEMATE
+        standPat = maxScore = -CHECKMATE
+    else:
+        standPat = turnMultiplier * scoreBoard(gs)
+        if standPat >= beta:
+            return standPat
+        if standPat > alpha:
+            alpha = standPat
+        maxScore = standPat
+
+    captures.sort(key=captureOrderScore, reverse=True)
+    for move in captures:
+        # delta pruning: even winning the piece for free can't bring the score back up to alpha
+        if not inCheck:
+            gain = pieceValues[move.pieceCaptured[1]] if move.pieceCaptured != "--" else 0
+            if move.isPawnPromotion:
+                gain += pieceValues[move.promotionChoice] - pieceValues["p"]
+            if standPat + gain + DELTA_MARGIN <= alpha:
+                continue
         gs.makeMove(move)
-        nextMoves = gs.getValidMoves()
-        score = - findMoveNegaMaxAlphaBeta(gs, nextMoves, depth-1, -beta, -alpha, -turnMultiplier)
+        score = - quiescence(gs, -beta, -alpha, -turnMultiplier, ply + 1)
+        gs.undoMove()
         if score > maxScore:
             maxScore = score
-            if depth == DEPTH:
+        if maxScore > alpha:
+            alpha = maxScore
+        if alpha >= beta:
+            break
+    return maxScore
+
+'''
+Principal variation search (when PVS is on): the first move, the best by move ordering, is searched with the
+full window. every other move is only checked with a null window to prove it isn't better, which cuts off much
+more, and searched again with the full window when it is.
+
+Null move pruning (NULL_MOVE): when the side to move could pass and still stay above beta after a shallower
+search, the position is cut off without searching a single move. not when in check, when the side to move has
+nothing but pawns (zugzwang, passing would be better than any move) or right after another null move. the pass
+is searched two plies shallower, three from depth 6 on. when that leaves only the capture search, the score has
+to be well above beta as well: after a pass the opponent's captures can run far deeper than the node they'd save
+
+Late move reductions (LMR): quiet moves that come late in the move order are searched one ply less deep, as
+they are unlikely to be good. one that beats alpha anyway is searched again to the full depth. captures,
+promotions, moves that give check, moves out of check and root moves aren't reduced
+
+A position that was already on the board (in the game or earlier in the search, since the last null move),
+or that is drawn by the fifty-move rule or insufficient material, scores a draw without being searched: if repeating it were good
+for one side it would be just as good to repeat it again, so the game would end drawn anyway
+'''
+def findMoveNegaMaxAlphaBeta(gs, validMoves, depth, alpha, beta, turnMultiplier, ply=0, allowNullMove=True):
+    global nextMove, counter, betaCutoffs, firstMoveCutoffs, researches, nullMoveCutoffs, reductionResearches
+    if ply > 0 and (gs.isRepetition() or gs.isInsufficientMaterial()):
+        return STALEMATE
+    if ply > 0 and gs.halfmoveClock >= 100:     # unless the hundredth move mated
+        if not gs.inCheck() or (validMoves if validMoves is not None else gs.getValidMoves()):
+            return STALEMATE
+        return -CHECKMATE
+    if depth == 0:
+        return quiescence(gs, alpha, beta, turnMultiplier, ply)
+    counter += 1
+    if counter % 32 == 0:    # a node costs far more than a clock read, so the budget is checked often
+        checkSearchLimits()
+    if not validMoves:      # the flags may be left over from a deeper search, so look at the king again
+        return -CHECKMATE if gs.inCheck() else STALEMATE
+
+    # look the position up in the transposition table, the root always searches so it can set nextMove
+    originalAlpha = alpha
+    hashMoveID = 0
+    entry = transpositionTable.probe(gs.zobristKey)
+    if entry is not None:
+        entryDepth, bound, entryScore, hashMoveID = entry
+        # only cutoffs, the window isn't narrowed so the bound stored below is against the window searched
+        if depth != searchDepth and entryDepth >= depth:
+            if bound == EXACT or (bound == LOWER_BOUND and entryScore >= beta) or (bound == UPPER_BOUND and entryScore <= alpha):
+                return entryScore
+
+    inCheck = gs.inCheck() if (LMR and depth >= LMR_MIN_DEPTH) or (NULL_MOVE and depth >= NULL_MOVE_MIN_DEPTH) else False
+    nullDepth = max(0, depth - 1 - (NULL_MOVE_REDUCTION if depth <= 5 else NULL_MOVE_DEEP_REDUCTION))
+    if NULL_MOVE and allowNullMove and ply > 0 and depth >= NULL_MOVE_MIN_DEPTH and not inCheck and beta < CHECKMATE and \
+            turnMultiplier * scoreBoard(gs) >= beta + (NULL_MOVE_QUIESCENCE_MARGIN if nullDepth == 0 else 0) and \
+            gs.hasNonPawnMaterial("w" if gs.whiteToMove else "b"):
+        gs.makeNullMove()
+        nextMoves = gs.getValidMoves() if nullDepth > 0 else None
+        score = - findMoveNegaMaxAlphaBeta(gs, nextMoves, nullDepth, -beta, -beta + 1, -turnMultiplier, ply + 1, False)
+        gs.undoNullMove()
+        if score >= beta:
+            nullMoveCutoffs += 1
+            return beta     # not the score, a mate found after passing proves nothing
+
+    maxScore = -CHECKMATE
+    bestMove = None
+    movesSearched = 0
+    for move in orderMoves(validMoves, hashMoveID, ply):
+        movesSearched += 1
+        gs.makeMove(move)
+        nextMoves = gs.getValidMoves() if depth > 1 else None    # quiescence generates its own captures
+        reduction = 0
+        if LMR and ply > 0 and depth >= LMR_MIN_DEPTH and movesSearched > LMR_MOVES and not inCheck and move.pieceCaptured == "--" \
+                and not move.isPawnPromotion and not gs.inCheck():
+            reduction = 1
+        if movesSearched == 1 or not (PVS or reduction):
+            score = - findMoveNegaMaxAlphaBeta(gs, nextMoves, depth-1, -beta, -alpha, -turnMultiplier, ply + 1)
+        else:
+            score = - findMoveNegaMaxAlphaBeta(gs, nextMoves, depth-1-reduction, -alpha - 1, -alpha, -turnMultiplier, ply + 1)
+            if reduction and score > alpha:
+                reductionResearches += 1
+                score = - findMoveNegaMaxAlphaBeta(gs, nextMoves, depth-1, -alpha - 1, -alpha, -turnMultiplier, ply + 1)
+            if alpha < score < beta:
+                researches += 1
+                score = - findMoveNegaMaxAlphaBeta(gs, nextMoves, depth-1, -beta, -alpha, -turnMultiplier, ply + 1)
+        if score > maxScore or bestMove is None:     # when every move gets mated there still is a move to play
+            maxScore = score
+            bestMove = move
+            if depth == searchDepth:
                 nextMove = move
         gs.undoMove()
         if maxScore > alpha: #pruning happens
             alpha = maxScore
         if alpha >= beta:
+            storeCutoffMove(move, depth, ply)
+            betaCutoffs += 1
+            if movesSearched == 1:
+                firstMoveCutoffs += 1
             break
 
+    if maxScore <= originalAlpha:
+        bound = UPPER_BOUND
+    elif maxScore >= beta:
+        bound = LOWER_BOUND
+    else:
+        bound = EXACT
+    transpositionTable.store(gs.zobristKey, depth, bound, maxScore, bestMove.moveID if bestMove else 0)
     return maxScore
 
 
 
-'''A POSITIVE Score is good for white, a negative score is good for black'''
+'''
+A POSITIVE Score is good for white, a negative score is good for black. material and piece square scores are
+kept up to date by makeMove and undoMove, so this doesn't have to look at the board
+'''
 def scoreBoard(gs):
     if gs.checkMate:
         if gs.whiteToMove:
             return -CHECKMATE #black wins
         else:
             return CHECKMATE #white wins
-    elif gs.staleMate:
+    elif gs.staleMate or gs.draw or gs.isInsufficientMaterial():     # draw is set by getValidMoves
         return STALEMATE
 
-    score = 0
-    for row in range(len(gs.board)):
-        for col in range(len(gs.board[row])):
-            square = gs.board[row][col]
-            if square != "--":
-                #score it positionally
-                piecePositionScore = 0
-                if square[1] != 'K':        #no position table for king
-                    if square[1] == "p":
-                        piecePositionScore = piecePositionScores[square][row][col]
-                    else:
-                        piecePositionScore = piecePositionScores[square[1]][row][col]
-
-
-                if square[0] == 'w':
-                    score += pieceScore[square[1]] + 0.2 * piecePositionScore
-                elif square[0] == 'b':
-                    score -= pieceScore[square[1]] + 0.2 * piecePositionScore
-
-    return score
+    return gs.materialScore + gs.positionScore
 
 
 '''
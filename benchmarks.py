@@ -0,0 +1,413 @@
+'''
+Benchmarks of the engine that are not about move generation (perft.py covers that).
+
+    python benchmarks.py parallel                       parallel search against the single process one
+    python benchmarks.py parallel --depth 4 --workers 8
+    python benchmarks.py pgn                            PGN reading, replaying and writing in games per second
+    python benchmarks.py pgn --file games.pgn --backend mailbox
+    python benchmarks.py moves                          size of a Move and how many are made per valid move
+    python benchmarks.py makeundo                       makeMove + undoMove pairs per second
+    python benchmarks.py book --file games.pgn          opening book build, open and lookup speed
+    python benchmarks.py games --games 100000 --plies 40    memory per game of GameState and CompactGameState
+    python benchmarks.py pvs --depth 5                  nodes with and without PVS and aspiration windows
+    python benchmarks.py pruning --depth 6              nodes with and without null move pruning and LMR
+'''
+
+import argparse
+import contextlib
+import copy
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import SmartMoveFinder
+import chess_engine
+import compact_engine
+import opening_book
+import perft
+import pgn
+
+
+'''
+runs findBestMoveNegaMax and findBestMoveParallel at the same depth on every position and prints the move,
+score, nodes and time of both and the speedup of the parallel search
+'''
+
+def benchmarkParallel(positions, depth, workers):
+    SmartMoveFinder.getSearchPool(workers)     # start the processes before the clock does
+    rows = []
+    for name in positions:
+        fen = perft.POSITIONS[name][0]
+        row = {"position": name}
+        for label, search in (("single", lambda gs, moves: SmartMoveFinder.findBestMoveNegaMax(gs, moves)),
+                              ("parallel", lambda gs, moves: SmartMoveFinder.findBestMoveParallel(gs, moves, depth, workers))):
+            gs = chess_engine.GameState.fromFen(fen)
+            SmartMoveFinder.setTranspositionTableSize(SmartMoveFinder.TT_SIZE_MB)
+            random.seed(1)      # both searches shuffle the root moves the same way
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):     # the searches print their own statistics
+                move = search(gs, gs.getValidMoves())
+            seconds = time.perf_counter() - start
+            entry = SmartMoveFinder.transpositionTable.probe(gs.zobristKey)
+            row[label] = {"move": move.getChessNotation() if move else "-", "score": entry[2] if entry else None,
+                          "nodes": SmartMoveFinder.counter + SmartMoveFinder.quiescenceCounter, "seconds": seconds}
+        row["speedup"] = row["single"]["seconds"] / row["parallel"]["seconds"]
+        rows.append(row)
+        print("%-12s single %-6s %6s %8d nodes %7.2f s   parallel %-6s %6s %8d nodes %7.2f s   speedup %.2f" % (
+            name, row["single"]["move"], row["single"]["score"], row["single"]["nodes"], row["single"]["seconds"],
+            row["parallel"]["move"], row["parallel"]["score"], row["parallel"]["nodes"], row["parallel"]["seconds"],
+            row["speedup"]))
+    single = sum(row["single"]["seconds"] for row in rows)
+    parallel = sum(row["parallel"]["seconds"] for row in rows)
+    print("Total: single %.2f s, parallel %.2f s with %d workers, speedup %.2f" % (single, parallel, workers, single / parallel))
+    return rows
+
+
+'''
+searches every position to the same depth by iterative deepening once per setting and prints the nodes, score
+and time of each. a setting is a label and the SmartMoveFinder switches to set for it, e.g. ("PVS", {"PVS": True}).
+every search starts with an empty transposition table and the same random seed
+'''
+
+def compareSearchSettings(positions, depth, settings):
+    saved = {name: getattr(SmartMoveFinder, name) for label, switches in settings for name in switches}
+    totals = {label: 0 for label, switches in settings}
+    try:
+        for name in positions:
+            line = "%-12s" % name
+            for label, switches in settings:
+                for switch, value in switches.items():
+                    setattr(SmartMoveFinder, switch, value)
+                gs = chess_engine.GameState.fromFen(perft.POSITIONS[name][0])
+                SmartMoveFinder.setTranspositionTableSize(SmartMoveFinder.TT_SIZE_MB)
+                random.seed(1)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    SmartMoveFinder.findBestMoveIterative(gs, gs.getValidMoves(), timeLimitMs=None, maxDepth=depth)
+                stats = SmartMoveFinder.searchStats
+                nodes = stats.nodes + stats.quiescenceNodes
+                totals[label] += nodes
+                line += "  %s %8d nodes %5s %6.2f s" % (label, nodes, stats.iterations[-1]["score"], stats.seconds)
+            print(line)
+    finally:
+        for switch, value in saved.items():
+            setattr(SmartMoveFinder, switch, value)
+    first = settings[0][0]
+    print("Total: " + ", ".join("%s %d nodes (%.0f%%)" % (label, nodes, 100 * nodes / totals[first]) for label, nodes in totals.items()))
+    return totals
+
+'''
+PVS and aspiration windows off, each on its own and both on. null move pruning and LMR are off for all of them
+'''
+
+def benchmarkPvs(positions, depth):
+    window = SmartMoveFinder.ASPIRATION_WINDOW or 50
+    off = {"NULL_MOVE": False, "LMR": False}
+    return compareSearchSettings(positions, depth, (("plain", dict(off, PVS=False, ASPIRATION_WINDOW=0)),
+                                                    ("PVS", dict(off, PVS=True, ASPIRATION_WINDOW=0)),
+                                                    ("aspiration", dict(off, PVS=False, ASPIRATION_WINDOW=window)),
+                                                    ("both", dict(off, PVS=True, ASPIRATION_WINDOW=window))))
+
+'''
+null move pruning and late move reductions off, each on its own and both on, with PVS and aspiration windows
+as they are set
+'''
+
+def benchmarkPruning(positions, depth):
+    return compareSearchSettings(positions, depth, (("full width", {"NULL_MOVE": False, "LMR": False}),
+                                                    ("null move", {"NULL_MOVE": True, "LMR": False}),
+                                                    ("LMR", {"NULL_MOVE": False, "LMR": True}),
+                                                    ("both", {"NULL_MOVE": True, "LMR": True})))
+
+
+'''
+writes games of random moves to a PGN file, something to benchmark the reader on when there is no real file
+'''
+
+def writeRandomGames(path, games, seed=1):
+    rng = random.Random(seed)
+    with open(path, "w") as file:
+        for index in range(games):
+            gs = perft.BACKENDS["bitboard"]()
+            for ply in range(rng.randint(20, 120)):
+                validMoves = gs.getValidMoves()
+                if len(validMoves) == 0:
+                    break
+                gs.makeMove(rng.choice(validMoves))
+            file.write(pgn.formatGameState(gs, {"Event": "Random game", "Round": index + 1}) + "\n")
+
+'''
+times reading the games of a PGN file, reading and replaying them into GameStates, and writing them again. the
+memory reading takes is measured in a separate pass, as tracemalloc slows everything down
+'''
+
+def benchmarkPgn(path, backend):
+    start = time.perf_counter()
+    with open(path) as file:
+        games = sum(1 for game in pgn.readGames(file))
+    readSeconds = time.perf_counter() - start
+
+    replayed = []
+    plies = 0
+    start = time.perf_counter()
+    with open(path) as file:
+        for headers, sanMoves, result in pgn.readGames(file):
+            gs = pgn.replayGame(headers, sanMoves, perft.BACKENDS[backend])
+            plies += len(gs.moveLog)
+            if len(replayed) < 200:
+                replayed.append((headers, gs, result))
+    replaySeconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for headers, gs, result in replayed:
+        pgn.formatGameState(gs, headers, result)
+    writeSeconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    with open(path) as file:
+        for game in pgn.readGames(file):
+            pass
+    peakBytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    print("%d games, %d plies, %.1f MB" % (games, plies, os.path.getsize(path) / 1e6))
+    print("read            %8.0f games/s" % (games / readSeconds))
+    print("read + replay   %8.0f games/s  %8.0f plies/s  (%s)" % (games / replaySeconds, plies / replaySeconds, backend))
+    print("write           %8.0f games/s" % (len(replayed) / writeSeconds))
+    print("peak memory while reading: %.0f kB" % (peakBytes / 1e3))
+
+
+'''
+generates the valid moves of the perft positions and prints how many are made per second, how many Move objects
+the generator makes per valid move (pseudo legal moves that are thrown away count too) and the memory a valid
+move takes when it is kept
+'''
+
+def benchmarkMoves(backend, mode, repeat):
+    positions = [perft.BACKENDS[backend].fromFen(fen) for fen, counts, depth in perft.POSITIONS.values()]
+    mode = mode or ("bitboard" if backend == "bitboard" else "naive")
+
+    start = time.perf_counter()
+    validMoves = 0
+    for i in range(repeat):
+        for gs in positions:
+            validMoves += len(gs.getValidMoves(mode))
+    seconds = time.perf_counter() - start
+
+    created = [0]
+    moveInit = chess_engine.Move.__init__
+    def countingInit(self, *args, **kwargs):
+        created[0] += 1
+        moveInit(self, *args, **kwargs)
+    chess_engine.Move.__init__ = countingInit
+    try:
+        movesPerPosition = [len(gs.getValidMoves(mode)) for gs in positions]
+    finally:
+        chess_engine.Move.__init__ = moveInit
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [gs.getValidMoves(mode) for gs in positions]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    keptBytes = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    keptBlocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    keptMoves = sum(len(moves) for moves in kept)
+    move = kept[0][0]
+    objectBytes = sys.getsizeof(move) + (sys.getsizeof(move.__dict__) if hasattr(move, "__dict__") else 0)
+
+    print("%s %s: %.0f valid moves/s" % (backend, mode, validMoves / seconds))
+    print("Move objects made per valid move: %.2f" % (created[0] / sum(movesPerPosition)))
+    print("size of a Move object: %d bytes" % objectBytes)
+    print("memory per kept valid move: %.0f bytes in %.2f blocks" % (keptBytes / keptMoves, keptBlocks / keptMoves))
+
+
+'''
+plays every valid move of the perft positions and takes it back again, repeat times, and prints the pairs
+per second and how many CastleRights objects a pair makes
+'''
+
+def benchmarkMakeUndo(backend, repeat):
+    positions = [perft.BACKENDS[backend].fromFen(fen) for fen, counts, depth in perft.POSITIONS.values()]
+    work = [(gs, gs.getValidMoves()) for gs in positions]
+
+    start = time.perf_counter()
+    pairs = 0
+    for i in range(repeat):
+        for gs, moves in work:
+            for move in moves:
+                gs.makeMove(move)
+                gs.undoMove()
+            pairs += len(moves)
+    seconds = time.perf_counter() - start
+
+    created = [0]
+    castleRightsInit = chess_engine.CastleRights.__init__
+    def countingInit(self, *args, **kwargs):
+        created[0] += 1
+        castleRightsInit(self, *args, **kwargs)
+    chess_engine.CastleRights.__init__ = countingInit
+    try:
+        for gs, moves in work:
+            for move in moves:
+                gs.makeMove(move)
+                gs.undoMove()
+    finally:
+        chess_engine.CastleRights.__init__ = castleRightsInit
+
+    print("%s: %.0f make/undo pairs/s" % (backend, pairs / seconds))
+    print("CastleRights objects made per pair: %.2f" % (created[0] / sum(len(moves) for gs, moves in work)))
+
+
+'''
+builds an opening book from a PGN file and times building it, opening it and looking up the positions of its
+games, against a search of the starting position, which is what a book move saves
+'''
+
+def benchmarkBook(path, plies, repeat):
+    with tempfile.TemporaryDirectory() as directory:
+        bookPath = os.path.join(directory, "book.bin")
+        start = time.perf_counter()
+        entries = opening_book.buildBook(path, bookPath, plies)
+        buildSeconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        book = opening_book.OpeningBook(bookPath)
+        openSeconds = time.perf_counter() - start
+
+        keys = []
+        with open(path) as file:
+            for headers, sanMoves, result in pgn.readGames(file):
+                if len(keys) >= 10000:
+                    break
+                gs = pgn.replayGame(headers, sanMoves[:plies])
+                keys.extend(gs.zobristLog)
+        start = time.perf_counter()
+        found = 0
+        for i in range(repeat):
+            for key in keys:
+                found += len(book.getMoves(key)) > 0
+        lookupSeconds = time.perf_counter() - start
+        book.close()
+
+    gs = chess_engine.GameState()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        SmartMoveFinder.findBestMoveNegaMax(gs, gs.getValidMoves())
+    searchSeconds = time.perf_counter() - start
+
+    print("%d entries, %d bytes, built in %.2f s" % (entries, opening_book.HEADER.size + entries * opening_book.ENTRY.size, buildSeconds))
+    print("open            %8.3f ms" % (openSeconds * 1000))
+    print("lookup          %8.0f lookups/s, %.0f%% of the positions in the book" % (
+        repeat * len(keys) / lookupSeconds, 100 * found / (repeat * len(keys))))
+    print("search of the starting position at depth %d: %.3f s" % (SmartMoveFinder.DEPTH, searchSeconds))
+
+
+'''
+keeps games games of plies random moves in memory, as GameStates and as CompactGameStates, and prints the bytes
+per game and the time it took to make them. the games are copies of one game, only sample of them are made as
+GameStates as they take so much more memory
+'''
+
+def benchmarkGames(games, plies, sample):
+    rng = random.Random(1)
+    gs = chess_engine.GameState()
+    for ply in range(plies):
+        validMoves = gs.getValidMoves()
+        if len(validMoves) == 0:
+            break
+        gs.makeMove(rng.choice(validMoves))
+    compactGame = compact_engine.CompactGameState.fromGameState(gs)
+
+    for label, count, makeGame in (("GameState", min(sample, games), lambda: copy.deepcopy(gs)),
+                                   ("CompactGameState", games, compactGame.copy)):
+        tracemalloc.start()
+        start = time.perf_counter()
+        kept = [makeGame() for i in range(count)]
+        seconds = time.perf_counter() - start
+        bytesPerGame = tracemalloc.get_traced_memory()[0] / count
+        tracemalloc.stop()
+        print("%-17s %7d games of %d plies: %7.0f bytes per game, %6.1f MB for %d games, made in %.2f s" % (
+            label, count, len(gs.moveLog), bytesPerGame, bytesPerGame * games / 1e6, games, seconds))
+        del kept
+
+    start = time.perf_counter()
+    newGames = [compact_engine.CompactGameState() for i in range(min(games, sample))]
+    seconds = time.perf_counter() - start
+    print("CompactGameState() %.1f us per new game" % (seconds / len(newGames) * 1e6))
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="search benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    parallel = commands.add_parser("parallel", help="parallel search against the single process search")
+    parallel.add_argument("--depth", type=int, default=SmartMoveFinder.DEPTH)
+    parallel.add_argument("--workers", type=int, default=SmartMoveFinder.PARALLEL_WORKERS)
+    parallel.add_argument("--position", action="append", choices=sorted(perft.POSITIONS),
+                          help="position of the perft suite to search, can be given more than once")
+    pgnParser = commands.add_parser("pgn", help="PGN reading, replaying and writing speed")
+    pgnParser.add_argument("--file", help="PGN file to read, games of random moves are made up if left out")
+    pgnParser.add_argument("--games", type=int, default=500, help="number of made up games")
+    pgnParser.add_argument("--backend", choices=sorted(perft.BACKENDS), default="bitboard")
+    movesParser = commands.add_parser("moves", help="Move objects: generation speed, count and size")
+    movesParser.add_argument("--backend", choices=sorted(perft.BACKENDS), default="mailbox")
+    movesParser.add_argument("--mode", help="getValidMoves mode, the backend's default if left out")
+    movesParser.add_argument("--repeat", type=int, default=20)
+    makeUndoParser = commands.add_parser("makeundo", help="makeMove + undoMove pairs per second")
+    makeUndoParser.add_argument("--backend", choices=sorted(perft.BACKENDS), default="mailbox")
+    makeUndoParser.add_argument("--repeat", type=int, default=200)
+    pvsParser = commands.add_parser("pvs", help="nodes with and without PVS and aspiration windows")
+    pvsParser.add_argument("--depth", type=int, default=4)
+    pvsParser.add_argument("--position", action="append", choices=sorted(perft.POSITIONS))
+    pruningParser = commands.add_parser("pruning", help="nodes with and without null move pruning and LMR")
+    pruningParser.add_argument("--depth", type=int, default=5)
+    pruningParser.add_argument("--position", action="append", choices=sorted(perft.POSITIONS))
+    gamesParser = commands.add_parser("games", help="memory per game of GameState and CompactGameState")
+    gamesParser.add_argument("--games", type=int, default=100000)
+    gamesParser.add_argument("--plies", type=int, default=40, help="random moves played in every game")
+    gamesParser.add_argument("--sample", type=int, default=2000, help="how many GameStates are really made")
+    bookParser = commands.add_parser("book", help="opening book build, open and lookup speed")
+    bookParser.add_argument("--file", help="PGN file to build the book from, games of random moves are made up if left out")
+    bookParser.add_argument("--games", type=int, default=2000, help="number of made up games")
+    bookParser.add_argument("--plies", type=int, default=opening_book.BOOK_PLIES)
+    bookParser.add_argument("--repeat", type=int, default=10)
+    options = parser.parse_args(args)
+
+    if options.command == "parallel":
+        SmartMoveFinder.DEPTH = options.depth
+        positions = options.position or ["start", "kiwipete", "position3", "position4", "position5", "position6"]
+        benchmarkParallel(positions, options.depth, options.workers)
+    elif options.command == "pvs":
+        benchmarkPvs(options.position or ["start", "kiwipete", "position3", "position4", "position5", "position6"], options.depth)
+    elif options.command == "pruning":
+        benchmarkPruning(options.position or ["start", "kiwipete", "position3", "position4", "position5", "position6"], options.depth)
+    elif options.command == "games":
+        benchmarkGames(options.games, options.plies, options.sample)
+    elif options.command == "makeundo":
+        benchmarkMakeUndo(options.backend, options.repeat)
+    elif options.command == "book":
+        if options.file:
+            benchmarkBook(options.file, options.plies, options.repeat)
+        else:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "random_games.pgn")
+                writeRandomGames(path, options.games)
+                benchmarkBook(path, options.plies, options.repeat)
+    elif options.command == "moves":
+        benchmarkMoves(options.backend, options.mode, options.repeat)
+    elif options.command == "pgn":
+        if options.file:
+            benchmarkPgn(options.file, options.backend)
+        else:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "random_games.pgn")
+                writeRandomGames(path, options.games)
+                benchmarkPgn(path, options.backend)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
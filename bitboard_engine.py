@@ -0,0 +1,445 @@
+'''
+A bitboard version of the GameState. Every piece type of every colour is stored as a 64 bit integer
+where bit (row * 8 + col) is set when that piece stands on the square, so square 0 is a8 and 63 is h1.
+The 8x8 board of strings is still kept up to date so the rest of the program (the GUI, the AI and Move)
+works with it exactly as with the normal GameState.
+'''
+
+from chess_engine import GameState, Move, castleRookSquares
+
+FULL_BOARD = (1 << 64) - 1
+PIECES = ("wp", "wN", "wB", "wR", "wQ", "wK", "bp", "bN", "bB", "bR", "bQ", "bK")
+
+
+def squareBit(r, c):
+    return 1 << (r * 8 + c)
+
+
+'''
+mirrors the board top to bottom (row r becomes row 7 - r), this is the byte swap used by hyperbola quintessence
+'''
+
+def flipVertical(bitboard):
+    return int.from_bytes(bitboard.to_bytes(8, "little"), "big")
+
+
+'''
+builds the attack table of a piece that jumps, for every square of the board
+'''
+
+def jumpAttacks(offsets):
+    table = []
+    for sq in range(64):
+        r, c = divmod(sq, 8)
+        attacks = 0
+        for dr, dc in offsets:
+            if 0 <= r + dr < 8 and 0 <= c + dc < 8:
+                attacks |= squareBit(r + dr, c + dc)
+        table.append(attacks)
+    return table
+
+
+'''
+builds the mask of every square on the line through sq in direction (dr, dc), sq itself excluded
+'''
+
+def lineMasks(dr, dc):
+    table = []
+    for sq in range(64):
+        r, c = divmod(sq, 8)
+        mask = 0
+        for sign in (1, -1):
+            i = 1
+            while 0 <= r + sign * dr * i < 8 and 0 <= c + sign * dc * i < 8:
+                mask |= squareBit(r + sign * dr * i, c + sign * dc * i)
+                i += 1
+        table.append(mask)
+    return table
+
+
+'''
+hyperbola quintessence does not work along a rank, so ranks use a lookup of every (col, occupancy of the row)
+'''
+
+def rankAttackTable():
+    table = []
+    for c in range(8):
+        row = []
+        for occupancy in range(256):
+            attacks = 0
+            for step in (1, -1):
+                col = c + step
+                while 0 <= col < 8:
+                    attacks |= 1 << col
+                    if occupancy & (1 << col):
+                        break
+                    col += step
+            row.append(attacks)
+        table.append(row)
+    return table
+
+
+KNIGHT_ATTACKS = jumpAttacks(((1, 2), (2, 1), (1, -2), (-2, 1), (-1, 2), (-1, -2), (-2, -1), (2, -1)))
+KING_ATTACKS = jumpAttacks(((-1, 0), (1, 0), (0, -1), (0, 1), (-1, 1), (-1, -1), (1, -1), (1, 1)))
+PAWN_ATTACKS = {"w": jumpAttacks(((-1, -1), (-1, 1))), "b": jumpAttacks(((1, -1), (1, 1)))}
+FILE_MASKS = lineMasks(1, 0)
+DIAGONAL_MASKS = lineMasks(1, 1)
+ANTI_DIAGONAL_MASKS = lineMasks(1, -1)
+RANK_ATTACKS = rankAttackTable()
+FLIPPED_SQUARES = [flipVertical(1 << sq) for sq in range(64)]
+CASTLE_ROOK_BITS = {kingSquare: sum(1 << sq for sq in rookSquares) for kingSquare, rookSquares in castleRookSquares.items()}
+
+
+'''
+sliding attacks along one file or diagonal by hyperbola quintessence: (o - 2s) ^ reverse(reverse(o) - 2 reverse(s))
+'''
+
+def lineAttacks(occupied, sq, mask):
+    forward = occupied & mask
+    reverse = flipVertical(forward)
+    forward = (forward - (2 << sq)) & FULL_BOARD
+    reverse = (reverse - 2 * FLIPPED_SQUARES[sq]) & FULL_BOARD
+    return (forward ^ flipVertical(reverse)) & mask
+
+
+def slowRookAttacks(occupied, sq):
+    rankShift = sq & 56
+    rankAttacks = RANK_ATTACKS[sq & 7][(occupied >> rankShift) & 255] << rankShift
+    return rankAttacks | lineAttacks(occupied, sq, FILE_MASKS[sq])
+
+
+def slowBishopAttacks(occupied, sq):
+    return lineAttacks(occupied, sq, DIAGONAL_MASKS[sq]) | lineAttacks(occupied, sq, ANTI_DIAGONAL_MASKS[sq])
+
+
+'''
+the squares whose occupancy matters to a slider on sq: its lines without the board edge they run into
+'''
+
+def relevantMask(sq, attacksOf):
+    r, c = divmod(sq, 8)
+    edges = 0
+    if r != 0:
+        edges |= 0xFF
+    if r != 7:
+        edges |= 0xFF << 56
+    if c != 0:
+        edges |= 0x0101010101010101
+    if c != 7:
+        edges |= 0x0101010101010101 << 7
+    return attacksOf(0, sq) & ~edges & FULL_BOARD
+
+
+ROOK_MASKS = [relevantMask(sq, slowRookAttacks) for sq in range(64)]
+BISHOP_MASKS = [relevantMask(sq, slowBishopAttacks) for sq in range(64)]
+# this plays the part of magic bitboards: the masked occupancy is the key into a per square table.
+# a dict does the hashing, entries are filled the first time an occupancy is seen
+ROOK_TABLES = [{} for sq in range(64)]
+BISHOP_TABLES = [{} for sq in range(64)]
+
+
+def rookAttacks(occupied, sq):
+    key = occupied & ROOK_MASKS[sq]
+    attacks = ROOK_TABLES[sq].get(key)
+    if attacks is None:
+        attacks = ROOK_TABLES[sq][key] = slowRookAttacks(key, sq)
+    return attacks
+
+
+def bishopAttacks(occupied, sq):
+    key = occupied & BISHOP_MASKS[sq]
+    attacks = BISHOP_TABLES[sq].get(key)
+    if attacks is None:
+        attacks = BISHOP_TABLES[sq][key] = slowBishopAttacks(key, sq)
+    return attacks
+
+
+'''
+the squares strictly between two squares on the same rank, file or diagonal
+'''
+
+def squaresBetween(sq1, sq2):
+    r1, c1 = divmod(sq1, 8)
+    r2, c2 = divmod(sq2, 8)
+    if r1 == r2 or c1 == c2:
+        return rookAttacks(1 << sq2, sq1) & rookAttacks(1 << sq1, sq2)
+    return bishopAttacks(1 << sq2, sq1) & bishopAttacks(1 << sq1, sq2)
+
+
+class BitboardGameState(GameState):
+
+    def __init__(self):
+        super().__init__()
+        self.syncBitboards()
+
+    def refreshPositionInfo(self):
+        super().refreshPositionInfo()
+        self.syncBitboards()
+
+    '''
+    rebuild every bitboard from the 8x8 board, needed whenever the board is set up by hand
+    '''
+
+    def syncBitboards(self):
+        self.bitboards = dict.fromkeys(PIECES, 0)
+        self.colorBitboards = {"w": 0, "b": 0}
+        for r in range(8):
+            for c in range(8):
+                piece = self.board[r][c]
+                if piece != "--":
+                    self.bitboards[piece] |= squareBit(r, c)
+                    self.colorBitboards[piece[0]] |= squareBit(r, c)
+
+    '''
+    flips the bits a move changes. placedPiece is what ends up on the end square (differs from
+    pieceMoved on a promotion). flipping the same bits again takes the move back
+    '''
+
+    def toggleMoveBits(self, move, placedPiece):
+        bitboards = self.bitboards
+        colorBitboards = self.colorBitboards
+        endSq = move.moveID >> 6 & 63
+        startBit = 1 << (move.moveID & 63)
+        endBit = 1 << endSq
+        color = move.pieceMoved[0]
+        bitboards[move.pieceMoved] ^= startBit
+        bitboards[placedPiece] ^= endBit
+        colorBitboards[color] ^= startBit | endBit
+        if move.pieceCaptured != "--":
+            captureBit = 1 << (move.startRow * 8 + move.endCol) if move.isEnpassantMove else endBit
+            bitboards[move.pieceCaptured] ^= captureBit
+            colorBitboards[move.pieceCaptured[0]] ^= captureBit
+        if move.isCastleMove:
+            rookBits = CASTLE_ROOK_BITS[endSq]
+            bitboards[color + "R"] ^= rookBits
+            colorBitboards[color] ^= rookBits
+
+    '''
+    the 8x8 board, scores, zobrist key and piece squares are kept by GameState.makeMove and undoMove as well,
+    the GUI and the AI use them, so making and taking back a move costs more than on a GameState
+    '''
+
+    def makeMove(self, move):
+        GameState.makeMove(self, move)
+        self.toggleMoveBits(move, self.board[move.endRow][move.endCol])
+
+    def undoMove(self):
+        if self.moveLog:
+            move = self.moveLog[-1]
+            self.toggleMoveBits(move, self.board[move.endRow][move.endCol])
+        GameState.undoMove(self)
+
+    '''
+    all pieces of byColor attacking the square sq, with the given occupancy of the board
+    '''
+
+    def attackersOf(self, sq, byColor, occupied):
+        bitboards = self.bitboards
+        queens = bitboards[byColor + "Q"]
+        # a pawn of byColor attacks sq from the squares a pawn of the other colour would attack from sq
+        return (KNIGHT_ATTACKS[sq] & bitboards[byColor + "N"]) | \
+               (KING_ATTACKS[sq] & bitboards[byColor + "K"]) | \
+               (PAWN_ATTACKS["b" if byColor == "w" else "w"][sq] & bitboards[byColor + "p"]) | \
+               (rookAttacks(occupied, sq) & (bitboards[byColor + "R"] | queens)) | \
+               (bishopAttacks(occupied, sq) & (bitboards[byColor + "B"] | queens))
+
+    '''
+    determine if the pieces of byColor attack the square sq
+    '''
+
+    def isSquareAttacked(self, sq, byColor):
+        return self.attackersOf(sq, byColor, self.colorBitboards["w"] | self.colorBitboards["b"]) != 0
+
+    def squareUnderAttack(self, r, c):
+        return self.isSquareAttacked(r * 8 + c, "b" if self.whiteToMove else "w")
+
+    '''
+    pinned pieces of the side to move, mapped to the squares they may still move to:
+    the line between the king and the pinning piece, the pinning piece included
+    '''
+
+    def getPinRays(self, kingSquare, allyColor, enemyColor, occupied):
+        pinRays = {}
+        bitboards = self.bitboards
+        allies = self.colorBitboards[allyColor]
+        enemies = self.colorBitboards[enemyColor]
+        queens = bitboards[enemyColor + "Q"]
+        # enemy sliders that would see the king if none of our pieces were in the way
+        snipers = (rookAttacks(enemies, kingSquare) & (bitboards[enemyColor + "R"] | queens)) | \
+                  (bishopAttacks(enemies, kingSquare) & (bitboards[enemyColor + "B"] | queens))
+        while snipers:
+            bit = snipers & -snipers
+            snipers ^= bit
+            between = squaresBetween(kingSquare, bit.bit_length() - 1)
+            blockers = between & occupied
+            if blockers and blockers & (blockers - 1) == 0 and blockers & allies:   # exactly one piece, ours
+                pinRays[blockers.bit_length() - 1] = between | bit
+        return pinRays
+
+    '''
+    All moves considering checks. mode "bitboard" generates from the bitboards, any other mode
+    falls back on the GameState generators so the two can be compared
+    '''
+
+    def getValidMoves(self, mode="bitboard"):
+        if mode != "bitboard":
+            return super().getValidMoves(mode)
+        return self.getBitboardMoves(False)[1]
+
+    '''
+    Captures and promotions only, for the quiescence search, with whether the side to move is in check. when in
+    check every legal move is returned (an evasion doesn't have to be a capture) and checkMate is set if there is none
+    '''
+
+    def getValidCaptures(self):
+        return self.getBitboardMoves(True)
+
+    '''
+    whether the side to move is in check and its legal moves from the bitboards, with capturesOnly only captures
+    and promotions unless in check
+    '''
+
+    def getBitboardMoves(self, capturesOnly):
+        moves = []
+        board = self.board
+        bitboards = self.bitboards
+        allyColor, enemyColor = ("w", "b") if self.whiteToMove else ("b", "w")
+        allies = self.colorBitboards[allyColor]
+        enemies = self.colorBitboards[enemyColor]
+        occupied = allies | enemies
+        notAllies = ~allies & FULL_BOARD
+        kingBit = bitboards[allyColor + "K"]
+        kingSquare = kingBit.bit_length() - 1
+        checkers = self.attackersOf(kingSquare, enemyColor, occupied)
+        capturesOnly = capturesOnly and not checkers
+        targetMask = enemies if capturesOnly else notAllies
+
+        # the king may go to any square not attacked once it has left its own square
+        targets = KING_ATTACKS[kingSquare] & targetMask
+        while targets:
+            bit = targets & -targets
+            targets ^= bit
+            end = bit.bit_length() - 1
+            if not self.attackersOf(end, enemyColor, occupied ^ kingBit):
+                moves.append(Move((kingSquare >> 3, kingSquare & 7), (end >> 3, end & 7), board))
+
+        if checkers & (checkers - 1):      # double check, the king has to move
+            checkMask = 0
+        elif checkers:                      # capture the checking piece or block it
+            checkMask = checkers | squaresBetween(kingSquare, checkers.bit_length() - 1)
+        else:
+            checkMask = FULL_BOARD
+        if checkMask:
+            pinRays = self.getPinRays(kingSquare, allyColor, enemyColor, occupied)
+            self.getPawnBitboardMoves(allyColor, enemies, occupied, checkMask, pinRays, capturesOnly, moves)
+            for pieceType in ("N", "B", "R", "Q"):
+                pieces = bitboards[allyColor + pieceType]
+                while pieces:
+                    bit = pieces & -pieces
+                    pieces ^= bit
+                    start = bit.bit_length() - 1
+                    if pieceType == "N":
+                        targets = KNIGHT_ATTACKS[start]
+                    elif pieceType == "B":
+                        targets = bishopAttacks(occupied, start)
+                    elif pieceType == "R":
+                        targets = rookAttacks(occupied, start)
+                    else:
+                        targets = rookAttacks(occupied, start) | bishopAttacks(occupied, start)
+                    targets &= targetMask & checkMask
+                    if start in pinRays:
+                        targets &= pinRays[start]
+                    while targets:
+                        endBit = targets & -targets
+                        targets ^= endBit
+                        end = endBit.bit_length() - 1
+                        moves.append(Move((start >> 3, start & 7), (end >> 3, end & 7), board))
+        if capturesOnly:
+            return False, moves
+        if not checkers:
+            self.getBitboardCastleMoves(kingSquare, allyColor, enemyColor, moves)
+
+        if len(moves) == 0:  # either checkmate or stalemate
+            if checkers:
+                self.checkMate = True
+            else:
+                self.staleMate = True
+            self.draw = False
+        else:
+            self.checkMate = False
+            self.staleMate = False
+            self.draw = self.getDrawReason(moves) is not None
+        return checkers != 0, moves
+
+    '''
+    legal pawn moves. pushes are shifts of the whole pawn bitboard, captures come from the attack table.
+    with capturesOnly the only pushes are promotions
+    '''
+
+    def getPawnBitboardMoves(self, allyColor, enemies, occupied, checkMask, pinRays, capturesOnly, moves):
+        board = self.board
+        pawns = self.bitboards[allyColor + "p"]
+        empty = ~occupied & FULL_BOARD
+        if allyColor == "w":
+            singlePushes = (pawns >> 8) & empty
+            doublePushes = ((singlePushes & 0x0000FF0000000000) >> 8) & empty    # row 5 on to row 4
+            forward = -8
+        else:
+            singlePushes = (pawns << 8) & empty
+            doublePushes = ((singlePushes & 0x0000000000FF0000) << 8) & empty    # row 2 on to row 3
+            forward = 8
+        if capturesOnly:
+            singlePushes &= 0xFF | 0xFF << 56   # first and last row
+            doublePushes = 0
+        for targets, distance in ((singlePushes & checkMask, forward), (doublePushes & checkMask, 2 * forward)):
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                end = bit.bit_length() - 1
+                start = end - distance
+                if start in pinRays and not bit & pinRays[start]:
+                    continue
+                self.addPawnMoves((start >> 3, start & 7), (end >> 3, end & 7), moves)
+
+        enpassantBit = squareBit(*self.enpassantPossible) if self.enpassantPossible else 0
+        while pawns:
+            bit = pawns & -pawns
+            pawns ^= bit
+            start = bit.bit_length() - 1
+            attacks = PAWN_ATTACKS[allyColor][start]
+            targets = attacks & enemies & checkMask
+            if start in pinRays:
+                targets &= pinRays[start]
+            while targets:
+                endBit = targets & -targets
+                targets ^= endBit
+                end = endBit.bit_length() - 1
+                self.addPawnMoves((start >> 3, start & 7), (end >> 3, end & 7), moves)
+            if attacks & enpassantBit:
+                # en passant takes two pawns off one row, so it is the one move still tried out on the bitboards
+                end = enpassantBit.bit_length() - 1
+                move = Move((start >> 3, start & 7), (end >> 3, end & 7), board, isEmpassantMove=True)
+                self.toggleMoveBits(move, move.pieceMoved)
+                kingSquare = self.bitboards[allyColor + "K"].bit_length() - 1
+                safe = not self.isSquareAttacked(kingSquare, "b" if allyColor == "w" else "w")
+                self.toggleMoveBits(move, move.pieceMoved)
+                if safe:
+                    moves.append(move)
+
+    '''
+    castle moves from the bitboards: the squares between king and rook are empty and
+    the squares the king crosses are not attacked. only called when not in check
+    '''
+
+    def getBitboardCastleMoves(self, kingSquare, allyColor, enemyColor, moves):
+        occupied = self.colorBitboards["w"] | self.colorBitboards["b"]
+        r, c = kingSquare >> 3, kingSquare & 7
+        rights = self.currentCastlingRights
+        kingside = rights.wks if allyColor == "w" else rights.bks
+        queenside = rights.wqs if allyColor == "w" else rights.bqs
+        if kingside and not occupied & (squareBit(r, c + 1) | squareBit(r, c + 2)):
+            if not self.isSquareAttacked(kingSquare + 1, enemyColor) and not self.isSquareAttacked(kingSquare + 2, enemyColor):
+                moves.append(Move((r, c), (r, c + 2), self.board, isCastleMove=True))
+        if queenside and not occupied & (squareBit(r, c - 1) | squareBit(r, c - 2) | squareBit(r, c - 3)):
+            if not self.isSquareAttacked(kingSquare - 1, enemyColor) and not self.isSquareAttacked(kingSquare - 2, enemyColor):
+                moves.append(Move((r, c), (r, c - 2), self.board, isCastleMove=True))
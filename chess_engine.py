@@ -3,6 +3,117 @@ This class is responsible for storing all information about the current state of
 also responsible for determining the valid moves at the current state. it will also keep a move log.
 '''
 
+import random
+import re
+
+'''
+Zobrist keys: a random 64 bit number for every piece on every square, for black to move, for each of the
+16 combinations of castling rights and for each en passant file. the key of a position is all the numbers of
+what is in it XORed together, so a move only has to XOR in and out the few numbers it changes
+'''
+zobristRandom = random.Random(20210521)     # fixed seed so the keys are the same on every run
+zobristPieceKeys = {piece: [zobristRandom.getrandbits(64) for sq in range(64)]
+                    for piece in ("wp", "wN", "wB", "wR", "wQ", "wK", "bp", "bN", "bB", "bR", "bQ", "bK")}
+zobristBlackToMoveKey = zobristRandom.getrandbits(64)
+zobristCastlingKeys = [zobristRandom.getrandbits(64) for rights in range(16)]
+zobristEnpassantKeys = [zobristRandom.getrandbits(64) for col in range(8)]
+
+squareCoordinates = [(sq // 8, sq % 8) for sq in range(64)]    # (row, col) of every square, made once instead of per move
+# end square of the king when castling: the squares the rook leaves and lands on, flipped in and out of pieceSquares
+castleRookSquares = {62: {63, 61}, 58: {56, 59}, 6: {7, 5}, 2: {0, 3}}
+
+'''
+for every square: the squares a knight or king there reaches, and the rays a rook or bishop there looks along
+(each ray a list of squares going outward). used to look for attackers from the attacked square
+'''
+def getSquaresAround(offsets):
+    return [[(r + dr, c + dc) for dr, dc in offsets if 0 <= r + dr < 8 and 0 <= c + dc < 8] for r, c in squareCoordinates]
+
+def getRays(directions):
+    rays = []
+    for r, c in squareCoordinates:
+        rays.append([[(r + dr * i, c + dc * i) for i in range(1, 8) if 0 <= r + dr * i < 8 and 0 <= c + dc * i < 8]
+                     for dr, dc in directions])
+    return rays
+
+knightSquares = getSquaresAround(((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)))
+kingSquares = getSquaresAround(((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)))
+rookRays = getRays(((-1, 0), (1, 0), (0, -1), (0, 1)))
+bishopRays = getRays(((-1, -1), (-1, 1), (1, -1), (1, 1)))
+
+
+pieceScore = {"K" : 0, "Q" : 10, "R" : 5, "B" : 3, "N" : 3, "p" : 1}
+
+knightScores = [[1, 1, 1, 1, 1, 1, 1, 1],
+                [1, 2, 2, 2, 2, 2, 2, 1],
+                [1, 2, 3, 3, 3, 3, 2, 1],
+                [1, 2, 3, 4, 4, 3, 2, 1],
+                [1, 2, 3, 4, 4, 3, 2, 1],
+                [1, 2, 3, 3, 3, 3, 2, 1],
+                [1, 2, 2, 2, 2, 2, 2, 1],
+                [1, 1, 1, 1, 1, 1, 1, 1]]
+
+BishopScores = [[4, 3, 2, 1, 1, 2, 3, 4],
+                [3, 4, 3, 2, 2, 3, 4, 3],
+                [2, 3, 4, 3, 3, 4, 3, 2],
+                [1, 2, 3, 4, 4, 3, 2, 1],
+                [1, 2, 3, 4, 4, 3, 2, 1],
+                [2, 3, 4, 3, 3, 4, 3, 2],
+                [3, 4, 3, 2, 2, 3, 4, 3],
+                [4, 3, 2, 1, 1, 2, 3, 4]]
+
+QueenScores = [ [1, 1, 1, 3, 1, 1, 1, 1],
+                [1, 2, 3, 3, 3, 1, 1, 1],
+                [1, 4, 3, 3, 3, 4, 2, 1],
+                [1, 2, 3, 3, 3, 2, 2, 1],
+                [1, 2, 3, 3, 3, 2, 2, 1],
+                [1, 4, 3, 3, 3, 4, 2, 1],
+                [1, 1, 2, 3, 3, 1, 1, 1],
+                [1, 1, 1, 3, 1, 1, 1, 1]]
+
+RookScores = [  [4, 3, 4, 4, 4, 4, 3, 4],
+                [4, 4, 4, 4, 4, 4, 4, 4],
+                [1, 1, 2, 3, 3, 2, 1, 1],
+                [1, 2, 3, 4, 4, 3, 2, 1],
+                [1, 2, 3, 4, 4, 3, 2, 1],
+                [1, 1, 2, 3, 3, 2, 1, 1],
+                [4, 4, 4, 4, 4, 4, 4, 4],
+                [4, 3, 4, 4, 4, 4, 3, 4]]
+
+whitePawnScores = [[8, 8, 8, 8, 8, 8, 8, 8],
+                   [8, 8, 8, 8, 8, 8, 8, 8],
+                   [5, 6, 6, 7, 7, 6, 6, 5],
+                   [2, 3, 3, 5, 5, 3, 3, 2],
+                   [1, 2, 3, 4, 4, 3, 2, 1],
+                   [1, 1, 2, 3, 3, 2, 1, 1],
+                   [1, 1, 1, 0, 0, 1, 1, 1],
+                   [0, 0, 0, 0, 0, 0, 0, 0]]
+
+blackPawnScores = [[0, 0, 0, 0, 0, 0, 0, 0],
+                   [1, 1, 1, 0, 0, 1, 1, 1],
+                   [1, 1, 2, 3, 3, 2, 1, 1],
+                   [1, 2, 3, 4, 4, 3, 2, 1],
+                   [2, 3, 3, 5, 5, 3, 3, 2],
+                   [5, 6, 6, 7, 7, 6, 6, 5],
+                   [8, 8, 8, 8, 8, 8, 8, 8],
+                   [8, 8, 8, 8, 8, 8, 8, 8]]
+
+piecePositionScores = {"N" : knightScores, "B" : BishopScores, "R" : RookScores, "Q" : QueenScores, "bp" : blackPawnScores,
+                        "wp" : whitePawnScores}
+
+'''
+the same scores in whole centipawns for the incremental evaluation: a pawn is 100 and a point of a square table
+is 20 (a fifth of a pawn). the values are signed, positive for white pieces and negative for black ones
+'''
+pieceValues = {piece: 100 * score for piece, score in pieceScore.items()}
+signedPieceValues = {}
+signedPositionScores = {}
+for color, sign in (("w", 1), ("b", -1)):
+    for pieceType in pieceScore:
+        piece = color + pieceType
+        signedPieceValues[piece] = sign * pieceValues[pieceType]
+        table = piecePositionScores.get(piece, piecePositionScores.get(pieceType))  # pawn tables are per colour
+        signedPositionScores[piece] = [sign * 20 * table[sq // 8][sq % 8] if table else 0 for sq in range(64)]
 
 
 class GameState:
@@ -24,54 +135,44 @@ class GameState:
             ["wR", "wN", "wB", "wQ", "wK", "wB", "wN", "wR"]
         ]
 
-        self.moveFunctions = {'p': self.getPawnMoves, 'R': self.getRookMoves, 'N': self.getKnightMoves,
-                              'B': self.getBishopMoves, 'Q': self. getQueenMoves, 'K': self.getKingMoves}
-
         self.whiteToMove = True
         self.moveLog = []
         self.whiteKingLocation = (7, 4)
         self.blackKingLocation = (0, 4)
         self.pins = []
         self.checks = []
+        self.attackMethod = "outward"   # how squareUnderAttack works, "moves" for the original move generation way
         self.checkMate = False
         self.staleMate = False
+        self.draw = False               # threefold repetition, fifty-move rule or insufficient material, see getDrawReason
         self.enpassantPossible = ()     # coordinates for the square where enpassant is possible
         self.currentCastlingRights = CastleRights(True, True, True, True)
-        self.CastleRightsLog = [CastleRights(self.currentCastlingRights.wks, self.currentCastlingRights.bks,
-                                             self.currentCastlingRights.wqs, self.currentCastlingRights.bqs)]
-
-        self.whiteValidMoves = []
-        self.blackValidMoves = []
-
-        self.protects = [[]]        # stores pieces info that can protect information pawn, knight, bishop, rook, queen, king
-        self.threatens = [[]]       # stores pieces info that can attack information pawn, knight, bishop, rook, queen, king
-        self.CanMoveTo = [[]]       # stores pieces info that can move to information pawn, knight, bishop, rook, queen, king
-
-        '''
-        for example 
-        
-        pawn  knight  bishop  rook  queen  king 
-        e4     d4      d6      g2    g6     a7
-        e5
-        etc ... 
-        '''
+        self.halfmoveClock = 0          # plies since the last capture or pawn move
+        self.fullmoveNumber = 1         # goes up by one after every black move
+        self.pieceSquares = self.computePieceSquares()    # "w"/"b": set of the squares (row * 8 + col) of its pieces
+        self.stateLog = [self.getPackedState()]     # castling, en passant and halfmove clock of every position
+        self.zobristLog = [self.computeZobristKey()]     # key of every position of the game, the current one last
+        self.materialScore, self.positionScore = self.computeScores()    # centipawns, positive is good for white
 
 
 
     def makeMove(self, move):
+        previousEnpassant = self.enpassantPossible
+        previousCastleIndex = self.currentCastlingRights.index()
         self.board[move.startRow][move.startCol] = "--"
         self.board[move.endRow][move.endCol] = move.pieceMoved
         self.moveLog.append(move)       #log the move so we can undo it later
         self.whiteToMove = not self.whiteToMove     # swap players
+        self.draw = False
         # update kings location
         if move.pieceMoved == "wK":
-            self.whiteKingLocation = (move.endRow, move.endCol)
+            self.whiteKingLocation = squareCoordinates[move.endRow * 8 + move.endCol]
         elif move.pieceMoved == "bK":
-            self.blackKingLocation = (move.endRow, move.endCol)
+            self.blackKingLocation = squareCoordinates[move.endRow * 8 + move.endCol]
 
         # pawn promotion
         if move.isPawnPromotion:
-            self.board[move.endRow][move.endCol] = move.pieceMoved[0] + 'Q'
+            self.board[move.endRow][move.endCol] = move.pieceMoved[0] + move.promotionChoice
 
         # enPassant Move
         if move.isEnpassantMove:
@@ -79,7 +180,7 @@ class GameState:
 
         # Update enPassantPossible variable
         if move.pieceMoved[1] == 'p' and abs(move.startRow - move.endRow) == 2:     # only on two squares pawn advances
-            self.enpassantPossible = ((move.startRow + move.endRow)//2, move.startCol)
+            self.enpassantPossible = squareCoordinates[(move.startRow + move.endRow) // 2 * 8 + move.startCol]
         else:
             self.enpassantPossible = ()
 
@@ -94,8 +195,25 @@ class GameState:
 
         # update castling rights - whenever it is a rook or a king move
         self.updateCastleRights(move)
-        self.CastleRightsLog.append(CastleRights(self.currentCastlingRights.wks, self.currentCastlingRights.bks,
-                                             self.currentCastlingRights.wqs, self.currentCastlingRights.bqs))
+        if move.pieceMoved[1] == 'p' or move.pieceCaptured != "--":
+            self.halfmoveClock = 0
+        else:
+            self.halfmoveClock += 1
+        self.stateLog.append(self.getPackedState())
+        if move.pieceMoved[0] == 'b':
+            self.fullmoveNumber += 1
+        self.zobristLog.append(self.getMoveZobristKey(move, previousEnpassant, previousCastleIndex))
+        materialChange, positionChange = self.getMoveScoreChange(move, self.board[move.endRow][move.endCol])
+        self.materialScore += materialChange
+        self.positionScore += positionChange
+        # the squares of the pieces
+        allies = self.pieceSquares[move.pieceMoved[0]]
+        allies.remove(move.moveID & 63)
+        allies.add(move.moveID >> 6 & 63)
+        if move.pieceCaptured != "--":
+            self.pieceSquares[move.pieceCaptured[0]].remove(move.startRow * 8 + move.endCol if move.isEnpassantMove else move.moveID >> 6 & 63)
+        if move.isCastleMove:
+            allies.symmetric_difference_update(castleRookSquares[move.endRow * 8 + move.endCol])
 
 
 
@@ -106,27 +224,36 @@ class GameState:
     def undoMove(self):
         if len(self.moveLog) != 0:
             move = self.moveLog.pop()
+            materialChange, positionChange = self.getMoveScoreChange(move, self.board[move.endRow][move.endCol])
+            self.materialScore -= materialChange
+            self.positionScore -= positionChange
+            allies = self.pieceSquares[move.pieceMoved[0]]
+            allies.remove(move.moveID >> 6 & 63)
+            allies.add(move.moveID & 63)
+            if move.pieceCaptured != "--":
+                self.pieceSquares[move.pieceCaptured[0]].add(move.startRow * 8 + move.endCol if move.isEnpassantMove else move.moveID >> 6 & 63)
+            if move.isCastleMove:
+                allies.symmetric_difference_update(castleRookSquares[move.endRow * 8 + move.endCol])
             self.board[move.startRow][move.startCol] = move.pieceMoved
             self.board[move.endRow][move.endCol] = move.pieceCaptured
             # self.moveLog = self.moveLog[:-1]
             self.whiteToMove = not self.whiteToMove  # swap players
             # update kings location
             if move.pieceMoved == "wK":
-                self.whiteKingLocation = (move.startRow, move.startCol)
+                self.whiteKingLocation = squareCoordinates[move.startRow * 8 + move.startCol]
             elif move.pieceMoved == "bK":
-                self.blackKingLocation = (move.startRow, move.startCol)
+                self.blackKingLocation = squareCoordinates[move.startRow * 8 + move.startCol]
             # undo en passant
             if move.isEnpassantMove:
                 self.board[move.endRow][move.endCol] = "--"
                 self.board[move.startRow][move.startCol] = move.pieceMoved
                 self.board[move.startRow][move.endCol] = move.pieceCaptured
-                self.enpassantPossible = (move.endRow, move.endCol)
-            if move.pieceMoved[1] == 'p' and abs(move.startRow - move.endRow) == 2:
-                self.enpassantPossible = ()
-            # undo castling rights
-            self.CastleRightsLog.pop()
-            NewRights = self.CastleRightsLog[-1]        # set the current castling rights to the previous one in the list
-            self.currentCastlingRights = CastleRights(NewRights.wks, NewRights.bks, NewRights.wqs, NewRights.bqs)
+            # castling rights, en passant square and halfmove clock go back to those of the previous position
+            self.stateLog.pop()
+            self.setPackedState(self.stateLog[-1])
+            if move.pieceMoved[0] == 'b':
+                self.fullmoveNumber -= 1
+            self.zobristLog.pop()
             # undo castle move
             if move.isCastleMove:
                 if move.endCol - move.startCol == 2:        # kingside
@@ -138,8 +265,337 @@ class GameState:
 
             self.checkMate = False
             self.staleMate = False
+            self.draw = False
 
+    '''
+    null move: the side to move passes. not a chess move, the search uses it to see whether a position is so good
+    that even passing keeps it above beta. it goes in the moveLog as None and is taken back with undoNullMove.
+    the halfmove clock starts again from 0 as after a pawn move, so a position that only comes back because a
+    side passed doesn't count as a repetition
+    '''
+
+    def makeNullMove(self):
+        key = self.zobristLog[-1] ^ zobristBlackToMoveKey
+        if self.enpassantPossible:
+            key ^= zobristEnpassantKeys[self.enpassantPossible[1]]
+        self.moveLog.append(None)
+        self.whiteToMove = not self.whiteToMove
+        self.enpassantPossible = ()
+        self.halfmoveClock = 0
+        self.stateLog.append(self.getPackedState())
+        self.zobristLog.append(key)
+        self.draw = False
+
+    def undoNullMove(self):
+        self.moveLog.pop()
+        self.whiteToMove = not self.whiteToMove
+        self.stateLog.pop()
+        self.setPackedState(self.stateLog[-1])
+        self.zobristLog.pop()
+        self.checkMate = False
+        self.staleMate = False
+        self.draw = False
 
+    '''
+    the squares of every piece of both sides, from the board. only needed when a position is set up by hand,
+    makeMove and undoMove keep pieceSquares up to date
+    '''
+
+    def computePieceSquares(self):
+        pieceSquares = {"w": set(), "b": set()}
+        for r in range(8):
+            for c in range(8):
+                if self.board[r][c] != "--":
+                    pieceSquares[self.board[r][c][0]].add(r * 8 + c)
+        return pieceSquares
+
+    '''
+    whether the side of color ("w" or "b") has a piece other than pawns and the king. without one zugzwang is
+    common, so the search doesn't try null moves
+    '''
+
+    def hasNonPawnMaterial(self, color):
+        board = self.board
+        for sq in self.pieceSquares[color]:
+            if board[sq >> 3][sq & 7][1] in "NBRQ":
+                return True
+        return False
+
+    '''
+    whether the current position was on the board at least times times before. only the positions since the last
+    capture or pawn move can be the same, and only every other one has the same side to move
+    '''
+
+    def isRepetition(self, times=1):
+        zobristLog = self.zobristLog
+        key = zobristLog[-1]
+        count = 0
+        for i in range(len(zobristLog) - 3, max(-1, len(zobristLog) - 2 - self.halfmoveClock), -2):
+            if zobristLog[i] == key:
+                count += 1
+                if count >= times:
+                    return True
+        return False
+
+    '''
+    whether neither side can ever checkmate: king against king, king and a knight or a bishop against a king, or
+    only bishops left that all stand on squares of the same colour
+    '''
+
+    def isInsufficientMaterial(self):
+        if len(self.pieceSquares["w"]) + len(self.pieceSquares["b"]) > 4:    # the common case, decided at once
+            return False
+        board = self.board
+        minors = []
+        for sq in self.pieceSquares["w"] | self.pieceSquares["b"]:
+            piece = board[sq >> 3][sq & 7][1]
+            if piece == 'B' or piece == 'N':
+                minors.append((piece, ((sq >> 3) + (sq & 7)) % 2))
+            elif piece != 'K':
+                return False
+        if len(minors) <= 1:
+            return True
+        return all(piece == 'B' for piece, squareColor in minors) and len({squareColor for piece, squareColor in minors}) == 1
+
+    '''
+    why the game is drawn in the current position, None when it isn't. a checkmate or stalemate isn't a draw
+    of this kind, getValidMoves checks those. a move that mates wins even when it is the hundredth without a
+    capture or pawn move; validMoves are the moves of the position when they are known already
+    '''
+
+    def getDrawReason(self, validMoves=None):
+        if self.halfmoveClock >= 8 and self.isRepetition(2):    # a position can't come back three times in less
+            return "threefold repetition"
+        if self.halfmoveClock >= 100 and (not self.inCheck() or (validMoves if validMoves is not None else self.getValidMoves("fast"))):
+            return "fifty-move rule"
+        if self.isInsufficientMaterial():
+            return "insufficient material"
+        return None
+
+
+
+    '''
+    castling rights (bits 0-3), en passant square + 1 (bits 4-10, 0 when there is none) and halfmove clock (from
+    bit 11) packed in one int, what undoMove needs to go back to a position besides the move itself
+    '''
+
+    def getPackedState(self):
+        state = self.currentCastlingRights.index() | self.halfmoveClock << 11
+        if self.enpassantPossible:
+            state |= (self.enpassantPossible[0] * 8 + self.enpassantPossible[1] + 1) << 4
+        return state
+
+    def setPackedState(self, state):
+        self.currentCastlingRights.setFromIndex(state & 15)
+        enpassantSquare = state >> 4 & 127
+        self.enpassantPossible = squareCoordinates[enpassantSquare - 1] if enpassantSquare else ()
+        self.halfmoveClock = state >> 11
+
+    '''
+    a GameState (or subclass) set up from a FEN string, e.g.
+    GameState.fromFen("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1").
+    the move counters may be left out, raises ValueError when the string isn't a FEN position or describes one
+    that can't come up in a game (castling rights or en passant square that don't fit the board, pawns on the
+    back ranks, the side not to move in check)
+    '''
+
+    @classmethod
+    def fromFen(cls, fen):
+        fields = fen.split()
+        if len(fields) not in (4, 6):
+            raise ValueError("a FEN needs 4 or 6 fields: " + fen)
+        gs = cls()
+        gs.board = []
+        for rowText in fields[0].split("/"):
+            row = []
+            for char in rowText:
+                if char in "12345678":
+                    row += ["--"] * int(char)
+                elif char in "KQRBNPkqrbnp":
+                    row.append(("w" if char.isupper() else "b") + (char.upper() if char not in "Pp" else "p"))
+                else:
+                    raise ValueError("unknown piece '" + char + "' in FEN: " + fen)
+            if len(row) != 8:
+                raise ValueError("every rank of a FEN needs 8 squares: " + fen)
+            gs.board.append(row)
+        if len(gs.board) != 8:
+            raise ValueError("a FEN needs 8 ranks: " + fen)
+        for king in ("wK", "bK"):
+            if sum(row.count(king) for row in gs.board) != 1:
+                raise ValueError("each side needs exactly one king in FEN: " + fen)
+        if any(piece[1] == "p" for piece in gs.board[0] + gs.board[7]):
+            raise ValueError("pawn on the first or last rank in FEN: " + fen)
+        if fields[1] not in ("w", "b") or not (fields[2] == "-" or re.fullmatch("K?Q?k?q?", fields[2]) and fields[2]):
+            raise ValueError("bad side to move or castling rights in FEN: " + fen)
+        gs.whiteToMove = fields[1] == "w"
+        # every castling right needs its king and rook still on their starting squares
+        for right, row, king, rookCol in (("K", 7, "wK", 7), ("Q", 7, "wK", 0), ("k", 0, "bK", 7), ("q", 0, "bK", 0)):
+            if right in fields[2] and (gs.board[row][4] != king or gs.board[row][rookCol] != king[0] + "R"):
+                raise ValueError("castling right " + right + " doesn't match the board in FEN: " + fen)
+        gs.currentCastlingRights = CastleRights("K" in fields[2], "k" in fields[2], "Q" in fields[2], "q" in fields[2])
+        if fields[3] == "-":
+            gs.enpassantPossible = ()
+        elif len(fields[3]) == 2 and fields[3][0] in Move.filesToCols and \
+                fields[3][1] == ("6" if gs.whiteToMove else "3"):
+            # the square a pawn just skipped: empty, with the pawn one square further on and nothing behind it
+            row, col = Move.ranksToRows[fields[3][1]], Move.filesToCols[fields[3][0]]
+            direction, pawn = (1, "bp") if gs.whiteToMove else (-1, "wp")
+            if gs.board[row][col] != "--" or gs.board[row - direction][col] != "--" or \
+                    gs.board[row + direction][col] != pawn:
+                raise ValueError("no pawn can have just skipped the en passant square in FEN: " + fen)
+            gs.enpassantPossible = (row, col)
+        else:
+            raise ValueError("bad en passant square in FEN: " + fen)
+        if len(fields) == 6:
+            if not (fields[4].isdigit() and fields[5].isdigit()):
+                raise ValueError("bad move counters in FEN: " + fen)
+            gs.halfmoveClock = int(fields[4])
+            gs.fullmoveNumber = max(1, int(fields[5]))
+        else:
+            gs.halfmoveClock = 0
+            gs.fullmoveNumber = 1
+        gs.refreshPositionInfo()
+        gs.whiteToMove = not gs.whiteToMove
+        kingRow, kingCol = gs.whiteKingLocation if gs.whiteToMove else gs.blackKingLocation
+        waitingSideInCheck = gs.squareUnderAttackOutward(kingRow, kingCol)
+        gs.whiteToMove = not gs.whiteToMove
+        if waitingSideInCheck:
+            raise ValueError("the side not to move is in check in FEN: " + fen)
+        return gs
+
+    '''
+    the current position as a FEN string
+    '''
+
+    def toFen(self):
+        rows = []
+        for row in self.board:
+            rowText = ""
+            empty = 0
+            for piece in row:
+                if piece == "--":
+                    empty += 1
+                    continue
+                if empty:
+                    rowText += str(empty)
+                    empty = 0
+                rowText += piece[1].upper() if piece[0] == "w" else piece[1].lower()
+            if empty:
+                rowText += str(empty)
+            rows.append(rowText)
+        rights = self.currentCastlingRights
+        castling = ("K" if rights.wks else "") + ("Q" if rights.wqs else "") + ("k" if rights.bks else "") + \
+                   ("q" if rights.bqs else "")
+        enpassant = Move.colsToFiles[self.enpassantPossible[1]] + Move.rowsToRanks[self.enpassantPossible[0]] \
+            if self.enpassantPossible else "-"
+        return " ".join(("/".join(rows), "w" if self.whiteToMove else "b", castling or "-", enpassant,
+                         str(self.halfmoveClock), str(self.fullmoveNumber)))
+
+    '''
+    after the board, side to move, castling rights, en passant square or move counters were set by hand: finds
+    the kings and starts the logs, the zobrist key and the scores again from the current position
+    '''
+
+    def refreshPositionInfo(self):
+        for r in range(8):
+            for c in range(8):
+                if self.board[r][c] == "wK":
+                    self.whiteKingLocation = (r, c)
+                elif self.board[r][c] == "bK":
+                    self.blackKingLocation = (r, c)
+        self.pieceSquares = self.computePieceSquares()
+        self.moveLog = []
+        self.checkMate = False
+        self.staleMate = False
+        self.draw = False
+        self.stateLog = [self.getPackedState()]
+        self.zobristLog = [self.computeZobristKey()]
+        self.materialScore, self.positionScore = self.computeScores()
+
+    '''
+    the zobrist key of the current position, kept up to date by makeMove and undoMove
+    '''
+
+    @property
+    def zobristKey(self):
+        return self.zobristLog[-1]
+
+    '''
+    compute the zobrist key from scratch, only needed when a position is set up by hand
+    '''
+
+    def computeZobristKey(self):
+        key = 0
+        for r in range(8):
+            for c in range(8):
+                if self.board[r][c] != "--":
+                    key ^= zobristPieceKeys[self.board[r][c]][r * 8 + c]
+        if not self.whiteToMove:
+            key ^= zobristBlackToMoveKey
+        key ^= zobristCastlingKeys[self.currentCastlingRights.index()]
+        if self.enpassantPossible:
+            key ^= zobristEnpassantKeys[self.enpassantPossible[1]]
+        return key
+
+    '''
+    the zobrist key after the move was made, from the key before it. called at the end of makeMove
+    '''
+
+    def getMoveZobristKey(self, move, previousEnpassant, previousCastleIndex):
+        key = self.zobristLog[-1] ^ zobristBlackToMoveKey
+        key ^= zobristPieceKeys[move.pieceMoved][move.startRow * 8 + move.startCol]
+        key ^= zobristPieceKeys[self.board[move.endRow][move.endCol]][move.endRow * 8 + move.endCol]   # promoted piece if any
+        if move.pieceCaptured != "--":
+            captureRow = move.startRow if move.isEnpassantMove else move.endRow
+            key ^= zobristPieceKeys[move.pieceCaptured][captureRow * 8 + move.endCol]
+        if move.isCastleMove:
+            rookKeys = zobristPieceKeys[move.pieceMoved[0] + 'R']
+            if move.endCol - move.startCol == 2:    # kingside rook
+                key ^= rookKeys[move.endRow * 8 + move.endCol + 1] ^ rookKeys[move.endRow * 8 + move.endCol - 1]
+            else:                                   # queenside rook
+                key ^= rookKeys[move.endRow * 8 + move.endCol - 2] ^ rookKeys[move.endRow * 8 + move.endCol + 1]
+        key ^= zobristCastlingKeys[previousCastleIndex] ^ zobristCastlingKeys[self.currentCastlingRights.index()]
+        if previousEnpassant:
+            key ^= zobristEnpassantKeys[previousEnpassant[1]]
+        if self.enpassantPossible:
+            key ^= zobristEnpassantKeys[self.enpassantPossible[1]]
+        return key
+
+    '''
+    material and piece square totals of the board from scratch, only needed when a position is set up by hand
+    '''
+
+    def computeScores(self):
+        material = 0
+        position = 0
+        for r in range(8):
+            for c in range(8):
+                piece = self.board[r][c]
+                if piece != "--":
+                    material += signedPieceValues[piece]
+                    position += signedPositionScores[piece][r * 8 + c]
+        return material, position
+
+    '''
+    how much the move changes the material and piece square totals. placedPiece is the piece standing on the end
+    square after the move (the promoted piece for a promotion)
+    '''
+
+    def getMoveScoreChange(self, move, placedPiece):
+        material = signedPieceValues[placedPiece] - signedPieceValues[move.pieceMoved]
+        position = signedPositionScores[placedPiece][move.endRow * 8 + move.endCol] - \
+                   signedPositionScores[move.pieceMoved][move.startRow * 8 + move.startCol]
+        if move.pieceCaptured != "--":
+            captureRow = move.startRow if move.isEnpassantMove else move.endRow
+            material -= signedPieceValues[move.pieceCaptured]
+            position -= signedPositionScores[move.pieceCaptured][captureRow * 8 + move.endCol]
+        if move.isCastleMove:
+            rookScores = signedPositionScores[move.pieceMoved[0] + 'R']
+            if move.endCol - move.startCol == 2:    # kingside rook
+                position += rookScores[move.endRow * 8 + move.endCol - 1] - rookScores[move.endRow * 8 + move.endCol + 1]
+            else:                                   # queenside rook
+                position += rookScores[move.endRow * 8 + move.endCol + 1] - rookScores[move.endRow * 8 + move.endCol - 2]
+        return material, position
 
     '''Update the Castle Rights'''
     def updateCastleRights(self, move):
@@ -176,13 +632,16 @@ class GameState:
                 elif move.endCol == 7:
                     self.currentCastlingRights.bks = False
 
-    '''All moves considering checks'''
+    '''
+    All moves considering checks.
+    mode "naive" makes every move and looks for attacks on the king, mode "fast" works out
+    pins and checks first so that illegal moves are never generated. sets checkMate, staleMate and draw
+    '''
 
-    def getValidMoves(self):
-        # naive methode of getting valid moves
-        tempEnpassantPossible = self.enpassantPossible
-        tempCastleRights = CastleRights(self.currentCastlingRights.wks, self.currentCastlingRights.bks,
-                                             self.currentCastlingRights.wqs, self.currentCastlingRights.bqs)    # copy of current castle rights
+    def getValidMoves(self, mode="naive"):
+        if mode == "fast":
+            return self.getValidMovesFast()
+        # naive methode of getting valid moves (undoMove puts the castle rights and en passant square back)
         # 1.) generate all possible moves
         moves = self.getAllPossibleMoves()
         if self.whiteToMove:
@@ -205,14 +664,145 @@ class GameState:
                 self.checkMate = True
             else:
                 self.staleMate = True
+            self.draw = False
         else:
             self.checkMate = False
             self.staleMate = False
+            self.draw = self.getDrawReason(moves) is not None
 
-        self.enpassantPossible = tempEnpassantPossible
-        self.currentCastlingRights = tempCastleRights
         return moves
 
+    '''All moves considering checks, using pins and checks instead of making every move'''
+
+    def getValidMovesFast(self, pinsAndChecks=None):
+        inCheck, self.pins, self.checks = pinsAndChecks or self.checkForPinsAndChecks()
+        if self.whiteToMove:
+            kingRow, kingCol = self.whiteKingLocation
+        else:
+            kingRow, kingCol = self.blackKingLocation
+
+        if inCheck:
+            if len(self.checks) == 1:   # only 1 check: block the check, capture the checker or move the king
+                moves = self.getAllPossibleMoves()
+                checkRow, checkCol, dRow, dCol = self.checks[0]
+                if self.board[checkRow][checkCol][1] == 'N':    # a knight can't be blocked, it must be captured
+                    validSquares = [(checkRow, checkCol)]
+                else:
+                    validSquares = []   # squares between the king and the checking piece, checker included
+                    for i in range(1, 8):
+                        validSquare = (kingRow + dRow * i, kingCol + dCol * i)
+                        validSquares.append(validSquare)
+                        if validSquare == (checkRow, checkCol):
+                            break
+                for i in range(len(moves) - 1, -1, -1):
+                    move = moves[i]
+                    if move.pieceMoved[1] == 'K':
+                        continue
+                    if (move.endRow, move.endCol) in validSquares:
+                        continue
+                    if move.isEnpassantMove and (move.startRow, move.endCol) == (checkRow, checkCol):
+                        continue    # en passant takes the checking pawn off a square it doesn't land on
+                    del moves[i]
+            else:   # double check, the king has to move
+                moves = []
+                self.getKingMoves(kingRow, kingCol, moves)
+        else:
+            moves = self.getAllPossibleMoves()
+            self.getCastleMovesFast(kingRow, kingCol, moves)
+
+        # the king can't step onto an attacked square, en passant can't uncover the king
+        for i in range(len(moves) - 1, -1, -1):
+            move = moves[i]
+            if move.pieceMoved[1] == 'K' and not move.isCastleMove:
+                if not self.isKingSafeAt(move.endRow, move.endCol):
+                    del moves[i]
+            elif move.isEnpassantMove and self.enpassantExposesKing(move):
+                del moves[i]
+
+        self.pins = []      # the generators only honour pins while generating for the side to move
+        self.checks = []
+        if len(moves) == 0:  # either checkmate or stalemate
+            if inCheck:
+                self.checkMate = True
+            else:
+                self.staleMate = True
+            self.draw = False
+        else:
+            self.checkMate = False
+            self.staleMate = False
+            self.draw = self.getDrawReason(moves) is not None
+        return moves
+
+    '''
+    Captures and promotions only, for the quiescence search, with whether the side to move is in check. when in
+    check every legal move is returned (an evasion doesn't have to be a capture) and checkMate is set if there is none
+    '''
+
+    def getValidCaptures(self):
+        pinsAndChecks = self.checkForPinsAndChecks()
+        if pinsAndChecks[0]:
+            return True, self.getValidMovesFast(pinsAndChecks)
+        inCheck, self.pins, self.checks = pinsAndChecks
+        moves = []
+        for sq in self.pieceSquares['w' if self.whiteToMove else 'b']:
+            self.getCaptureMoves(sq >> 3, sq & 7, moves)
+        self.pins = []
+        self.checks = []
+        return False, moves
+
+    '''
+    Get the captures and promotions of the piece at row r and column c and add them to the list.
+    pins are honoured, the king only takes unprotected pieces and en passant can't uncover the king
+    '''
+
+    def getCaptureMoves(self, r, c, moves):
+        piece = self.board[r][c][1]
+        pinDirection = self.getPinDirection(r, c) if self.pins else ()
+        enemyColor = "b" if self.whiteToMove else "w"
+        if piece == 'p':
+            moveAmount = -1 if self.whiteToMove else 1
+            if (r + moveAmount == 0 or r + moveAmount == 7) and self.board[r + moveAmount][c] == "--":
+                if not pinDirection or pinDirection in ((moveAmount, 0), (-moveAmount, 0)):
+                    self.addPawnMoves((r, c), (r + moveAmount, c), moves)    # promotion push
+            for dCol in (-1, 1):
+                if 0 <= c + dCol <= 7:
+                    if pinDirection and pinDirection not in ((moveAmount, dCol), (-moveAmount, -dCol)):
+                        continue
+                    if self.board[r + moveAmount][c + dCol][0] == enemyColor:
+                        self.addPawnMoves((r, c), (r + moveAmount, c + dCol), moves)
+                    elif (r + moveAmount, c + dCol) == self.enpassantPossible:
+                        move = Move((r, c), (r + moveAmount, c + dCol), self.board, isEmpassantMove=True)
+                        if not self.enpassantExposesKing(move):
+                            moves.append(move)
+        elif piece == 'N' or piece == 'K':
+            if piece == 'N':
+                if pinDirection:
+                    return
+                offsets = ((1, 2), (2, 1), (1, -2), (-2, 1), (-1, 2), (-1, -2), (-2, -1), (2, -1))
+            else:
+                offsets = ((-1, 0), (1, 0), (0, -1), (0, 1), (-1, 1), (-1, -1), (1, -1), (1, 1))
+            for m in offsets:
+                endRow = r + m[0]
+                endCol = c + m[1]
+                if 0 <= endRow < 8 and 0 <= endCol < 8 and self.board[endRow][endCol][0] == enemyColor:
+                    if piece == 'N' or self.isKingSafeAt(endRow, endCol):
+                        moves.append(Move((r, c), (endRow, endCol), self.board))
+        else:
+            directions = ()
+            if piece != 'B':
+                directions += ((-1, 0), (0, -1), (1, 0), (0, 1))
+            if piece != 'R':
+                directions += ((-1, 1), (-1, -1), (1, 1), (1, -1))
+            for d in directions:
+                if pinDirection and pinDirection != d and pinDirection != (-d[0], -d[1]):
+                    continue
+                endRow = r + d[0]
+                endCol = c + d[1]
+                while 0 <= endRow < 8 and 0 <= endCol < 8 and self.board[endRow][endCol] == "--":
+                    endRow += d[0]
+                    endCol += d[1]
+                if 0 <= endRow < 8 and 0 <= endCol < 8 and self.board[endRow][endCol][0] == enemyColor:
+                    moves.append(Move((r, c), (endRow, endCol), self.board))
 
     def inCheck(self):
         if self.whiteToMove:
@@ -221,16 +811,64 @@ class GameState:
             return self.squareUnderAttack(self.blackKingLocation[0], self.blackKingLocation[1])
 
     ''' 
-    determine if the enemy can attack the square r, c
+    determine if the enemy can attack the square r, c. attackMethod picks how: "outward" looks from the square
+    for pieces that can reach it, "moves" generates all the enemy moves and looks for one ending on the square
     '''
 
     def squareUnderAttack(self, r, c):
+        if self.attackMethod == "outward":
+            return self.squareUnderAttackOutward(r, c)
+        return self.squareUnderAttackByMoves(r, c)
+
+    '''
+    looks outward from the square: enemy pawns on its diagonals, knights and a king a jump away, and the first
+    piece along every rook and bishop ray
+    '''
+
+    def squareUnderAttackOutward(self, r, c):
+        board = self.board
+        if self.whiteToMove:
+            enemy, enemyPawn, enemyKnight, enemyKing, pawnRow = 'b', 'bp', 'bN', 'bK', r - 1
+        else:
+            enemy, enemyPawn, enemyKnight, enemyKing, pawnRow = 'w', 'wp', 'wN', 'wK', r + 1
+        if 0 <= pawnRow < 8:
+            if (c > 0 and board[pawnRow][c - 1] == enemyPawn) or (c < 7 and board[pawnRow][c + 1] == enemyPawn):
+                return True
+        sq = r * 8 + c
+        for row, col in knightSquares[sq]:
+            if board[row][col] == enemyKnight:
+                return True
+        for row, col in kingSquares[sq]:
+            if board[row][col] == enemyKing:
+                return True
+        for rays, sliders in ((rookRays[sq], 'RQ'), (bishopRays[sq], 'BQ')):
+            for ray in rays:
+                for row, col in ray:
+                    piece = board[row][col]
+                    if piece != "--":
+                        if piece[0] == enemy and piece[1] in sliders:
+                            return True
+                        break
+        return False
+
+    '''
+    the original way: generate every enemy move and see if one ends on the square
+    '''
+
+    def squareUnderAttackByMoves(self, r, c):
         self.whiteToMove = not self.whiteToMove     # switch to opponent's turn
         oppMoves = self.getAllPossibleMoves()
         self.whiteToMove = not self.whiteToMove  # switch to opponent's turn
         for move in oppMoves:
             if move.endRow == r and move.endCol == c:    # square under attack
-                return True
+                if move.pieceMoved[1] != 'p' or move.startCol != move.endCol:   # a pawn push attacks nothing
+                    return True
+        # pawns only generate captures onto occupied squares, so look for their diagonals directly
+        enemyPawn, pawnRow = ("bp", r - 1) if self.whiteToMove else ("wp", r + 1)
+        if 0 <= pawnRow < 8:
+            for pawnCol in (c - 1, c + 1):
+                if 0 <= pawnCol < 8 and self.board[pawnRow][pawnCol] == enemyPawn:
+                    return True
         return False
 
     def checkForPinsAndChecks(self):
@@ -283,119 +921,138 @@ class GameState:
                             else:   # piece blocking so pinned
                                 pins.append(possiblePin)
                                 break
+                        else:   # enemy piece not applying a check blocks the rest of this direction
+                            break
                 else:       # off board
                     break
-            # check for knight checks
-            KnightMoves = ((1, 2), (2, 1), (1, -2), (-2, 1), (-1, 2), (-1, -2), (-2, -1), (2, -1))
-            for m in KnightMoves:
-                endRow = startRow + m[0]
-                endCol = startCol + m[1]
-                if 0 <= endRow < 8 and 0 <= endCol < 8:
-                    endPiece = self.board[endRow][endCol]
+        # check for knight checks
+        KnightMoves = ((1, 2), (2, 1), (1, -2), (-2, 1), (-1, 2), (-1, -2), (-2, -1), (2, -1))
+        for m in KnightMoves:
+            endRow = startRow + m[0]
+            endCol = startCol + m[1]
+            if 0 <= endRow < 8 and 0 <= endCol < 8:
+                endPiece = self.board[endRow][endCol]
                 if endPiece[0] == enemyColor and endPiece[1] == "N":        # enemy knight attacking king
                     inCheck = True
                     checks.append((endRow, endCol, m[0], m[1]))
-            return inCheck, pins, checks
+        return inCheck, pins, checks
+
+    '''
+    returns the direction the piece at r, c is pinned from, or () if it is free to move
+    '''
 
+    def getPinDirection(self, r, c):
+        for pin in self.pins:
+            if pin[0] == r and pin[1] == c:
+                return (pin[2], pin[3])
+        return ()
 
-    '''All moves without considering checks'''
+    '''
+    determine if the king of the side to move would be safe on the square r, c.
+    only the stored king location is moved, the board itself is not touched
+    '''
+
+    def isKingSafeAt(self, r, c):
+        if self.whiteToMove:
+            kingLocation = self.whiteKingLocation
+            self.whiteKingLocation = (r, c)
+        else:
+            kingLocation = self.blackKingLocation
+            self.blackKingLocation = (r, c)
+        inCheck = self.checkForPinsAndChecks()[0]
+        # place king back on original location
+        if self.whiteToMove:
+            self.whiteKingLocation = kingLocation
+        else:
+            self.blackKingLocation = kingLocation
+        return not inCheck
+
+    '''
+    an en passant capture takes two pawns off the same row at once, which can uncover
+    a rook or queen on the king's row even though neither pawn is pinned on its own
+    '''
+
+    def enpassantExposesKing(self, move):
+        if self.whiteToMove:
+            kingRow, kingCol = self.whiteKingLocation
+            enemyColor = "b"
+        else:
+            kingRow, kingCol = self.blackKingLocation
+            enemyColor = "w"
+        if kingRow != move.startRow:
+            return False
+        step = 1 if move.startCol > kingCol else -1
+        col = kingCol + step
+        while 0 <= col < 8:
+            if col != move.startCol and col != move.endCol:
+                piece = self.board[kingRow][col]
+                if piece != "--":
+                    return piece[0] == enemyColor and piece[1] in ('R', 'Q')
+            col += step
+        return False
+
+
+    '''
+    All moves without considering checks. only the squares of the side to move are visited, in the order of
+    their set: always the same for the same game, but not board order, sorting on every call cost too much
+    '''
 
     def getAllPossibleMoves(self):
         moves = []
-        for r in range(len(self.board)):            # number of rows
-            for c in range(len(self.board[r])):
-                turn = self.board[r][c][0]
-                if (turn == 'w' and self.whiteToMove) or (turn == 'b' and not self.whiteToMove):
-                    piece = self.board[r][c][1]
-                    self.moveFunctions[piece](r, c, moves)  # calls appropriate move function based on piece type
+        for sq in self.pieceSquares['w' if self.whiteToMove else 'b']:
+            r = sq >> 3
+            c = sq & 7
+            getattr(self, self.moveFunctions[self.board[r][c][1]])(r, c, moves)  # calls appropriate move function based on piece type
 
         return moves
 
     '''Get all pawn moves located at row r and column c and add moves to the list'''
 
     def getPawnMoves(self, r, c, moves):
-        if self.whiteToMove:                # white pawn moves
-            if self.board[r-1][c] == "--":  # square pawn advance
-                moves.append(Move((r, c), (r-1, c), self.board))
-            if r == 6 and self.board[r-1][c] == "--" and self.board[r-2][c] == "--":
-                moves.append(Move((r, c), (r-2, c), self.board))
-            if c - 1 >= 0:          # captures to the left
-                if self.board[r-1][c-1][0] == "b":
-                    moves.append(Move((r, c), (r - 1, c - 1), self.board))
-                elif (r-1, c-1) == self.enpassantPossible:
-                    moves.append(Move((r, c), (r - 1, c - 1), self.board, isEmpassantMove=True))
-            if c + 1 <= 7:       # captures to the right
-                if self.board[r-1][c+1][0] == "b":
-                    moves.append(Move((r, c), (r - 1, c + 1), self.board))
-                elif (r - 1, c + 1) == self.enpassantPossible:
-                    moves.append(Move((r, c), (r - 1, c + 1), self.board, isEmpassantMove=True))
-        else:   # black pawn moves
-            if self.board[r + 1][c] == "--":  # square pawn advance
-                moves.append(Move((r, c), (r + 1, c), self.board))
-            if r == 1 and self.board[r + 1][c] == "--" and self.board[r + 2][c] == "--":
-                moves.append(Move((r, c), (r + 2, c), self.board))
-            if c - 1 >= 0:  # captures to the left
-                if self.board[r + 1][c - 1][0] == "w":
-                    moves.append(Move((r, c), (r + 1, c - 1), self.board))
-                elif (r + 1, c - 1) == self.enpassantPossible:
-                    moves.append(Move((r, c), (r + 1, c - 1), self.board, isEmpassantMove=True))
-            if c + 1 <= 7:  # captures to the right
-                if self.board[r + 1][c + 1][0] == "w":
-                    moves.append(Move((r, c), (r + 1, c + 1), self.board))
-                elif (r + 1, c + 1) == self.enpassantPossible:
-                    moves.append(Move((r, c), (r + 1, c + 1), self.board, isEmpassantMove=True))
-
-        # Add pawn promotions
-
-
-        # piecePinned = False
-        # pinDirection = ()
-        # for i in range(len(self.pins)-1, -1, -1):
-        #     if self.pins[i][0] == r and self.pins[i][1] == c:
-        #         piecePinned = True
-        #         pinDirection = (self.pins[i][2], self.pins[i][3])
-        #         self.pins.remove(self.pins[i])
-        #         break
-        #
-        # if self.whiteToMove:                # white pawn moves
-        #     if self.board[r-1][c] == "--":  # square pawn advance
-        #         if not piecePinned or pinDirection == (-1, 0):
-        #             moves.append(Move((r, c), (r-1, c), self.board))
-        #             if r == 6 and self.board[r-2][c] == "--":
-        #                 moves.append(Move((r, c), (r-2, c), self.board))
-        #         if c - 1 >= 0:          # captures to the left
-        #             if self.board[r-1][c-1][0] == "b":
-        #                 if not piecePinned or pinDirection == (-1, -1):
-        #                     moves.append(Move((r, c), (r - 1, c - 1), self.board))
-        #         if c + 1 < 7:       # captures to the right
-        #             if self.board[r-1][c+1][0] == "b":
-        #                 if not piecePinned or pinDirection == (-1, 1):
-        #                     moves.append(Move((r, c), (r - 1, c + 1), self.board))
-        # else:   # black pawn moves
-        #     if self.board[r + 1][c] == "--":  # square pawn advance
-        #         if not piecePinned or pinDirection == (1, 0):
-        #             moves.append(Move((r, c), (r + 1, c), self.board))
-        #             if r == 1 and self.board[r + 2][c] == "--":
-        #                 moves.append(Move((r, c), (r + 2, c), self.board))
-        #         if c - 1 >= 0:  # captures to the left
-        #             if self.board[r + 1][c - 1][0] == "w":
-        #                 if not piecePinned or pinDirection == (1, -1):
-        #                     moves.append(Move((r, c), (r + 1, c - 1), self.board))
-        #         if c + 1 < 7:  # captures to the right
-        #             if self.board[r + 1][c + 1][0] == "w":
-        #                 if not piecePinned or pinDirection == (1, 1):
-        #                     moves.append(Move((r, c), (r + 1, c + 1), self.board))
-        #
-        # # Add pawn promotions
+        pinDirection = self.getPinDirection(r, c) if self.pins else ()
+        if self.whiteToMove:
+            moveAmount = -1
+            startRow = 6
+            enemyColor = "b"
+        else:
+            moveAmount = 1
+            startRow = 1
+            enemyColor = "w"
 
+        if self.board[r + moveAmount][c] == "--":  # square pawn advance
+            if not pinDirection or pinDirection in ((moveAmount, 0), (-moveAmount, 0)):
+                self.addPawnMoves((r, c), (r + moveAmount, c), moves)
+                if r == startRow and self.board[r + 2 * moveAmount][c] == "--":
+                    moves.append(Move((r, c), (r + 2 * moveAmount, c), self.board))
+        for dCol in (-1, 1):    # captures to the left and to the right
+            if 0 <= c + dCol <= 7:
+                if pinDirection and pinDirection not in ((moveAmount, dCol), (-moveAmount, -dCol)):
+                    continue
+                if self.board[r + moveAmount][c + dCol][0] == enemyColor:
+                    self.addPawnMoves((r, c), (r + moveAmount, c + dCol), moves)
+                elif (r + moveAmount, c + dCol) == self.enpassantPossible:
+                    moves.append(Move((r, c), (r + moveAmount, c + dCol), self.board, isEmpassantMove=True))
 
+    '''
+    adds a pawn move to the list, reaching the last row it becomes one move per promotion piece
+    '''
+
+    def addPawnMoves(self, startSq, endSq, moves):
+        if endSq[0] == 0 or endSq[0] == 7:
+            for piece in Move.promotionPieces:
+                moves.append(Move(startSq, endSq, self.board, promotionChoice=piece))
+        else:
+            moves.append(Move(startSq, endSq, self.board))
 
     '''Get all Rook moves located at row r and column c and add moves to the list'''
 
     def getRookMoves(self, r, c, moves):
+        pinDirection = self.getPinDirection(r, c) if self.pins else ()
         directions = ((-1, 0), (0, -1), (1, 0), (0, 1))  # up, left, down, right
         enemyColor = "b" if self.whiteToMove else "w"
         for d in directions:
+            if pinDirection and pinDirection != d and pinDirection != (-d[0], -d[1]):
+                continue    # a pinned piece can only slide along the pin
             for i in range(1, 8):
                 endRow = r + d[0] * i
                 endCol = c + d[1] * i
@@ -411,38 +1068,11 @@ class GameState:
                 else:
                     break
 
-
-        # piecePinned = False
-        # pinDirection = ()
-        # for i in range(len(self.pins) - 1, -1, -1):
-        #     if self.pins[i][0] == r and self.pins[i][1] == c:
-        #         piecePinned = True
-        #         pinDirection = (self.pins[i][2], self.pins[i][3])
-        #         if self.board[r][c][1] != 'Q':       # can't remove queen from pin on rook moves, only remove it on bishop moves
-        #             self.pins.remove(self.pins[i])
-        #         break
-        # directions = ((-1, 0), (0, -1), (1, 0), (0, 1))     # up, left, down, right
-        # enemyColor = "b" if self.whiteToMove else "w"
-        # for d in directions:
-        #     for i in range(1, 8):
-        #         endRow = r + d[0] * i
-        #         endCol = c + d[1] * i
-        #         if 0 <= endRow < 8 and 0 <= endCol < 8:     # on board
-        #             if not piecePinned or pinDirection == d or pinDirection == (-d[0], -d[1]):
-        #                 endPiece = self.board[endRow][endCol]
-        #                 if endPiece == "--":    # empty space valid
-        #                     moves.append(Move((r, c), (endRow, endCol), self.board))
-        #                 elif endPiece[0] == enemyColor:
-        #                     moves.append(Move((r, c), (endRow, endCol), self.board))
-        #                     break
-        #                 else:       # friendly piece invalid
-        #                     break
-        #         else:
-        #             break
-
     '''Get all Knight moves located at row r and column c and add moves to the list'''
 
     def getKnightMoves(self, r, c, moves):
+        if self.pins and self.getPinDirection(r, c):
+            return      # a pinned knight can never move
         KnightMoves = ((1, 2), (2, 1), (1, -2), (-2, 1), (-1, 2), (-1, -2), (-2, -1), (2, -1))
         enemyColor = "b" if self.whiteToMove else "w"
         for m in KnightMoves:
@@ -453,36 +1083,15 @@ class GameState:
                 if endPiece[0] == enemyColor or endPiece == "--":
                     moves.append(Move((r, c), (endRow, endCol), self.board))
 
-
-        # piecePinned = False
-        # pinDirection = ()
-        # for i in range(len(self.pins) - 1, -1, -1):
-        #     if self.pins[i][0] == r and self.pins[i][1] == c:
-        #         piecePinned = True
-        #         pinDirection = (self.pins[i][2], self.pins[i][3])
-        #         if self.board[r][c][
-        #             1] != 'Q':  # can't remove queen from pin on rook moves, only remove it on bishop moves
-        #             self.pins.remove(self.pins[i])
-        #         break
-        # KnightMoves = ((1, 2), (2, 1), (1, -2), (-2, 1), (-1, 2), (-1, -2), (-2, -1), (2, -1))
-        # enemyColor = "b" if self.whiteToMove else "w"
-        # for m in KnightMoves:
-        #     endRow = r + m[0]
-        #     endCol = c + m[1]
-        #     if 0 <= endRow < 8 and 0 <= endCol < 8:  # on board
-        #         if not piecePinned:
-        #             endPiece = self.board[endRow][endCol]
-        #             if endPiece[0] == enemyColor or endPiece == "--":
-        #                 moves.append(Move((r, c), (endRow, endCol), self.board))
-
-
-
     '''Get all Bishop moves located at row r and column c and add moves to the list'''
 
     def getBishopMoves(self, r, c, moves):
+        pinDirection = self.getPinDirection(r, c) if self.pins else ()
         directions = ((-1, 1), (-1, -1), (1, 1), (1, -1))  # up-right, up-left, down-right, down-left
         enemyColor = "b" if self.whiteToMove else "w"
         for d in directions:
+            if pinDirection and pinDirection != d and pinDirection != (-d[0], -d[1]):
+                continue    # a pinned piece can only slide along the pin
             for i in range(1, 8):
                 endRow = r + d[0] * i
                 endCol = c + d[1] * i
@@ -498,34 +1107,6 @@ class GameState:
                 else:
                     break
 
-
-        # piecePinned = False
-        # pinDirection = ()
-        # for i in range(len(self.pins) - 1, -1, -1):
-        #     if self.pins[i][0] == r and self.pins[i][1] == c:
-        #         piecePinned = True
-        #         pinDirection = (self.pins[i][2], self.pins[i][3])
-        #         self.pins.remove(self.pins[i])
-        #         break
-        # directions = ((-1, 1), (-1, -1), (1, 1), (1, -1))  # up-right, up-left, down-right, down-left
-        # enemyColor = "b" if self.whiteToMove else "w"
-        # for d in directions:
-        #     for i in range(1, 8):
-        #         endRow = r + d[0] * i
-        #         endCol = c + d[1] * i
-        #         if 0 <= endRow < 8 and 0 <= endCol < 8:  # on board
-        #             if not piecePinned or pinDirection == d or pinDirection == (-d[0], -d[1]):
-        #                 endPiece = self.board[endRow][endCol]
-        #                 if endPiece == "--":  # empty space valid
-        #                     moves.append(Move((r, c), (endRow, endCol), self.board))
-        #                 elif endPiece[0] == enemyColor:
-        #                     moves.append(Move((r, c), (endRow, endCol), self.board))
-        #                     break
-        #                 else:  # friendly piece invalid
-        #                     break
-        #         else:
-        #             break
-
     '''Get all Queen moves located at row r and column c and add moves to the list'''
 
     def getQueenMoves(self, r, c, moves):
@@ -569,29 +1150,25 @@ class GameState:
 
 
 
-        # rowMoves = (-1, -1, -1, 0, 0, 1, 1, 1)
-        # ColMoves = (-1, 0, 1, -1, 1, -1, 0, 1)
-        # allyColor = "w" if self.whiteToMove else "b"
-        # for i in range(8):
-        #     endRow = r + rowMoves[i]
-        #     endCol = c + ColMoves[i]
-        #     if 0 <= endRow < 8 and 0 <= endCol < 8:  # on board
-        #         endPiece = self.board[endRow][endCol]
-        #         if endPiece[0] != allyColor:        # not an ally piece
-        #             # place king on end square and check for checks
-        #             if allyColor == "w":
-        #                 self.whiteKingLocation = (endRow, endCol)
-        #             else:
-        #                 self.blackKingLocation = (endRow, endCol)
-        #             inCheck, pins, checks = self.checkForPinsAndChecks()
-        #             if not inCheck:
-        #                 moves.append(Move((r, c), (endRow, endCol), self.board))
-        #             #place king back on original location
-        #             if allyColor == "w":
-        #                 self.whiteKingLocation = (r, c)
-        #             else:
-        #                 self.blackKingLocation = (r, c)
-        
+    '''
+    castle moves for the fast generator, the squares the king crosses are tested with the
+    king safety check instead of generating every enemy move
+    '''
+
+    def getCastleMovesFast(self, r, c, moves):
+        if (self.whiteToMove and self.currentCastlingRights.wks) or (not self.whiteToMove and self.currentCastlingRights.bks):
+            if self.board[r][c+1] == '--' and self.board[r][c+2] == '--':
+                if self.isKingSafeAt(r, c+1) and self.isKingSafeAt(r, c+2):
+                    moves.append(Move((r, c), (r, c+2), self.board, isCastleMove=True))
+        if (self.whiteToMove and self.currentCastlingRights.wqs) or (not self.whiteToMove and self.currentCastlingRights.bqs):
+            if self.board[r][c-1] == '--' and self.board[r][c-2] == '--' and self.board[r][c-3] == '--':
+                if self.isKingSafeAt(r, c-1) and self.isKingSafeAt(r, c-2):
+                    moves.append(Move((r, c), (r, c-2), self.board, isCastleMove=True))
+
+    # name of the move function of every piece, looked up on the GameState so subclasses can override them
+    moveFunctions = {'p': "getPawnMoves", 'R': "getRookMoves", 'N': "getKnightMoves", 'B': "getBishopMoves",
+                     'Q': "getQueenMoves", 'K': "getKingMoves"}
+
 class CastleRights():
     def __init__(self, wks, bks, wqs, bqs):
         self.wks = wks
@@ -599,6 +1176,17 @@ class CastleRights():
         self.wqs = wqs
         self.bqs = bqs
 
+    '''the four rights as a number from 0 to 15'''
+    def index(self):
+        return self.wks | self.wqs << 1 | self.bks << 2 | self.bqs << 3
+
+    '''sets the rights back from a number made by index()'''
+    def setFromIndex(self, index):
+        self.wks = bool(index & 1)
+        self.wqs = bool(index & 2)
+        self.bks = bool(index & 4)
+        self.bqs = bool(index & 8)
+
 class Move():
     # maps keys to values
     # key : value
@@ -610,7 +1198,13 @@ class Move():
                    "e": 4, "f": 5, "g": 6, "h": 7}
     colsToFiles = {v: k for k, v in filesToCols.items()}
 
-    def __init__(self, startSq, endSq, board, isEmpassantMove = False, isCastleMove = False):
+    promotionPieces = ('Q', 'R', 'B', 'N')     # index of the piece is part of the moveID, so a queen keeps the plain ID
+
+    # no __dict__ per move: the generators make thousands of moves per position
+    __slots__ = ('startRow', 'startCol', 'endRow', 'endCol', 'pieceMoved', 'pieceCaptured', 'isPawnPromotion',
+                 'promotionChoice', 'isEnpassantMove', 'isCastleMove', 'moveID')
+
+    def __init__(self, startSq, endSq, board, isEmpassantMove = False, isCastleMove = False, promotionChoice = 'Q'):
         self.startRow = startSq[0]
         self.startCol = startSq[1]
         self.endRow = endSq[0]
@@ -619,13 +1213,18 @@ class Move():
         self.pieceCaptured = board[self.endRow][self.endCol]
         # pawn promotion
         self.isPawnPromotion = (self.pieceMoved == 'wp' and self.endRow == 0) or (self.pieceMoved == 'bp' and self.endRow == 7)
+        self.promotionChoice = promotionChoice
         # enpassant stuff
         self.isEnpassantMove = isEmpassantMove
         if self.isEnpassantMove:
             self.pieceCaptured = 'wp' if self.pieceMoved == 'bp' else 'bp'
         # castle move
         self.isCastleMove = isCastleMove
-        self.moveID = self.startRow * 1000 + self.startCol * 100 + self.endRow * 10 + self.endCol
+        # packed in 14 bits: start square (row * 8 + col) in bits 0-5, end square in bits 6-11 and the index of the
+        # promotion piece in bits 12-13. start and end are never the same, so 0 is free to mean "no move"
+        self.moveID = self.startRow * 8 + self.startCol | (self.endRow * 8 + self.endCol) << 6
+        if self.isPawnPromotion:
+            self.moveID |= self.promotionPieces.index(promotionChoice) << 12
         #print(self.moveID)
 
     def __eq__(self, other):
@@ -633,11 +1232,17 @@ class Move():
             return self.moveID == other.moveID
         return False
 
+    def __hash__(self):
+        return self.moveID
+
 
 
     def getChessNotation(self):
         # can add more to this function to make it real chess notation
-        return self.getRankFile(self.startRow, self.startCol) + self.getRankFile(self.endRow, self.endCol)
+        notation = self.getRankFile(self.startRow, self.startCol) + self.getRankFile(self.endRow, self.endCol)
+        if self.isPawnPromotion:
+            notation += self.promotionChoice.lower()
+        return notation
 
 
     def getRankFile(self,r,c):
@@ -4,7 +4,10 @@ i.e: the chess board and the pieces
 '''
 
 import pygame as p
-from chess import chess_engine, SmartMoveFinder
+import chess_engine, SmartMoveFinder
+import copy
+import queue
+import threading
 import time
 
 WIDTH = HEIGHT = 512
@@ -41,17 +44,23 @@ def main():
     moveMade = False    # flag variable for when a move is made
     animate = False     # flag variable for when we should animate
     load_images() #this is only done once, before while loop
+    SmartMoveFinder.loadOpeningBook()    # the AI plays from book.bin while the game is in it
     running = True
     sqSelected = ()     # no square is selected initially   (tuple (row,col))
     playerClicks = []   # keeps track of player clicks (two tuples [(6,4),(4,4)])
     gameOver = False
     playerOne = True # if a human is playing white, this is true. If AI then False
     playerTwo = True # same as above but for black
+    AIThinking = False  # the AI is searching in the background
+    moveFinderThread = None
+    returnQueue = None  # the AI puts its move in here when it is done
     while running:
         humanTurn = (gs.whiteToMove and playerOne) or (not gs.whiteToMove and playerTwo)
         for e in p.event.get():
             if e.type == p.QUIT:
                 running = False
+                if AIThinking:
+                    stopMoveFinder(moveFinderThread)
             # mouse handler
             elif e.type == p.MOUSEBUTTONDOWN:
                 if not gameOver and humanTurn:
@@ -81,11 +90,17 @@ def main():
                 # key handler
             elif e.type == p.KEYDOWN:
                 if e.key == p.K_z:
+                    if AIThinking:      # the AI was searching the position that gets undone
+                        stopMoveFinder(moveFinderThread)
+                        AIThinking = False
                     gs.undoMove()
                     moveMade = True
                     animate = False
                     gameOver = False
                 if e.key == p.K_r :      # resets the board when r is pressed
+                    if AIThinking:
+                        stopMoveFinder(moveFinderThread)
+                        AIThinking = False
                     gs = chess_engine.GameState()
                     validMoves = gs.getValidMoves()
                     sqSelected = ()
@@ -94,14 +109,20 @@ def main():
                     animate = False
                     gameOver = False
 
-        # AI move finder
-        if not gameOver and not humanTurn:
-            AIMove = SmartMoveFinder.findBestMoveNegaMax(gs, validMoves)
-            if AIMove is None:
-                AIMove = SmartMoveFinder.findRandomMove(validMoves)
-            gs.makeMove(AIMove)
-            moveMade = True
-            animate = True
+        # AI move finder, runs in its own thread so the window keeps drawing and handling events
+        if not gameOver and not humanTurn and running:
+            if not AIThinking:
+                AIThinking = True
+                returnQueue = queue.Queue()
+                moveFinderThread = threading.Thread(target=findAIMove, args=(copy.deepcopy(gs), list(validMoves), returnQueue),
+                                                    daemon=True)
+                moveFinderThread.start()
+            elif not returnQueue.empty():
+                AIMove = returnQueue.get()
+                gs.makeMove(AIMove)
+                moveMade = True
+                animate = True
+                AIThinking = False
             #time.sleep(0.75)
 
 
@@ -113,6 +134,8 @@ def main():
             animate = False
 
         drawGameState(screen, gs, validMoves, sqSelected)
+        if AIThinking:
+            drawThinking(screen)
 
         if gs.checkMate:
             gameOver = True
@@ -124,10 +147,41 @@ def main():
         elif gs.staleMate:
             gameOver = True
             drawText(screen, "Stalemate")
+
+        elif gs.draw:
+            gameOver = True
+            drawText(screen, "Draw by " + gs.getDrawReason())
         clock.tick(MAX_FPS)
         p.display.flip()
 
 
+'''
+searches the AI move, meant to run in its own thread on a copy of the game. the move is put in returnQueue,
+nothing is put in it when the search was stopped
+'''
+
+def findAIMove(gs, validMoves, returnQueue):
+    AIMove = SmartMoveFinder.findBookMove(gs, validMoves)
+    if AIMove is not None:
+        returnQueue.put(AIMove)
+        return
+    try:
+        AIMove = SmartMoveFinder.findBestMoveNegaMax(gs, validMoves)
+    except SmartMoveFinder.SearchTimeout:
+        return
+    if AIMove is None:
+        AIMove = SmartMoveFinder.findRandomMove(validMoves)
+    returnQueue.put(AIMove)
+
+'''
+stops the AI search and waits for its thread to finish, which takes a few nodes at most
+'''
+
+def stopMoveFinder(moveFinderThread):
+    SmartMoveFinder.searchStop.set()
+    moveFinderThread.join()
+    SmartMoveFinder.searchStop.clear()
+
 '''
 Draws the squares of the board and generates the piece images as well within a current game state
 '''
@@ -204,6 +258,12 @@ def animateMove(move, screen, board, clock):
         p.display.flip()
 
 
+def drawThinking(screen):
+    font = p.font.SysFont("Helvetica", 16, True, False)
+    textObject = font.render("Thinking...", 0, p.Color('Blue'))
+    screen.blit(textObject, (5, 5))
+
+
 def drawText(screen, text):
     font = p.font.SysFont("Helvetica", 32, True, False)
     textObject = font.render(text, 0, p.Color('Red'))
@@ -211,4 +271,5 @@ def drawText(screen, text):
     screen.blit(textObject, textLocation)
 
 
-main()
+if __name__ == "__main__":
+    main()
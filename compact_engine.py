@@ -0,0 +1,211 @@
+'''
+A GameState for keeping very many games in memory at once, e.g. a server with tens of thousands of games going
+on. A CompactGameState has no __dict__ and keeps everything packed:
+
+    board           bytearray of 64 piece codes
+    moveLog         array of 32 bit moves (moveID, piece moved, piece captured, en passant and castle flags)
+    stateLog        array of the packed castling rights / en passant square / halfmove clock of every position
+    zobristLog      array of the 64 bit zobrist key of every position
+
+A new game takes about 490 bytes (a GameState 3.9 kB) and every move adds 16 bytes (about 150). The rules
+aren't written again: getValidMoves and makeMove load the position into a GameState kept per thread, let it do
+the work and pack the result, so they behave exactly the same. undoMove only has to put the packed pieces back.
+Loading a position takes about as long as generating its moves, so this is for hosting games, not for
+searching them: toGameState() gives a full GameState of the game to search.
+
+    python benchmarks.py games --games 100000 --plies 40       bytes per game and time to make them
+'''
+
+import threading
+from array import array
+
+import bitboard_engine
+import chess_engine
+
+PIECES = ("--", "wp", "wN", "wB", "wR", "wQ", "wK", "bp", "bN", "bB", "bR", "bQ", "bK")     # piece of every code
+PIECE_CODES = {piece: code for code, piece in enumerate(PIECES)}
+
+scratch = threading.local()     # per thread: {GameState class: [GameState, CompactGameState loaded in it, plies]}
+
+
+'''
+a move in 32 bits: moveID in bits 0-13, code of the piece moved in 14-17 and of the piece captured in 18-21,
+en passant in bit 22 and castling in bit 23
+'''
+
+def packMove(move):
+    return move.moveID | PIECE_CODES[move.pieceMoved] << 14 | PIECE_CODES[move.pieceCaptured] << 18 | \
+        move.isEnpassantMove << 22 | move.isCastleMove << 23
+
+
+class CompactGameState:
+
+    __slots__ = ("board", "moveLog", "stateLog", "zobristLog", "whiteToMove", "fullmoveNumber", "checkMate", "staleMate",
+                 "draw")
+
+    engineClass = chess_engine.GameState     # the GameState the rules are run on
+
+    def __init__(self):
+        self.setFromGameState(self.engineClass())
+
+    '''
+    packs the position and history of gs into this game
+    '''
+
+    def setFromGameState(self, gs):
+        self.board = bytearray(PIECE_CODES[piece] for row in gs.board for piece in row)
+        self.moveLog = array('I', [packMove(move) for move in gs.moveLog])
+        self.stateLog = array('I', gs.stateLog)
+        self.zobristLog = array('Q', gs.zobristLog)
+        self.whiteToMove = gs.whiteToMove
+        self.fullmoveNumber = gs.fullmoveNumber
+        self.checkMate = gs.checkMate
+        self.staleMate = gs.staleMate
+        self.draw = gs.draw
+
+    @classmethod
+    def fromGameState(cls, gs):
+        game = cls.__new__(cls)
+        game.setFromGameState(gs)
+        return game
+
+    @classmethod
+    def fromFen(cls, fen):
+        return cls.fromGameState(cls.engineClass.fromFen(fen))
+
+    def copy(self):
+        game = self.__class__.__new__(self.__class__)
+        game.board = bytearray(self.board)
+        game.moveLog = array('I', self.moveLog)
+        game.stateLog = array('I', self.stateLog)
+        game.zobristLog = array('Q', self.zobristLog)
+        game.whiteToMove = self.whiteToMove
+        game.fullmoveNumber = self.fullmoveNumber
+        game.checkMate = self.checkMate
+        game.staleMate = self.staleMate
+        game.draw = self.draw
+        return game
+
+    @property
+    def zobristKey(self):
+        return self.zobristLog[-1]
+
+    @property
+    def halfmoveClock(self):
+        return self.stateLog[-1] >> 11
+
+    '''
+    the GameState of this thread with the current position of this game loaded. of the history only the zobrist
+    keys are loaded, for repetitions. it is only loaded again when another game (or another move of this one)
+    was loaded since
+    '''
+
+    def getEngine(self):
+        engines = scratch.__dict__.setdefault("engines", {})
+        loaded = engines.get(self.engineClass)
+        if loaded is None:
+            loaded = engines[self.engineClass] = [self.engineClass(), None, -1]
+        engine, game, plies = loaded
+        if game is not self or plies != len(self.stateLog):
+            board = self.board
+            engine.board = [[PIECES[code] for code in board[row:row + 8]] for row in range(0, 64, 8)]
+            engine.whiteToMove = self.whiteToMove
+            engine.setPackedState(self.stateLog[-1])
+            engine.fullmoveNumber = self.fullmoveNumber
+            engine.refreshPositionInfo()
+            engine.zobristLog = self.zobristLog.tolist()
+            loaded[1] = self
+            loaded[2] = len(self.stateLog)
+        return engine
+
+    def getValidMoves(self, mode=None):
+        engine = self.getEngine()
+        moves = engine.getValidMoves() if mode is None else engine.getValidMoves(mode)
+        self.checkMate = engine.checkMate
+        self.staleMate = engine.staleMate
+        self.draw = engine.draw
+        return moves
+
+    def inCheck(self):
+        return self.getEngine().inCheck()
+
+    def getDrawReason(self):
+        return self.getEngine().getDrawReason()
+
+    def makeMove(self, move):
+        engine = self.getEngine()
+        engine.makeMove(move)
+        board = self.board
+        engineBoard = engine.board
+        for sq in (move.startRow * 8 + move.startCol, move.endRow * 8 + move.endCol, move.startRow * 8 + move.endCol):
+            board[sq] = PIECE_CODES[engineBoard[sq >> 3][sq & 7]]     # the last one is the en passant square
+        if move.isCastleMove:
+            for sq in chess_engine.castleRookSquares[move.endRow * 8 + move.endCol]:
+                board[sq] = PIECE_CODES[engineBoard[sq >> 3][sq & 7]]
+        self.moveLog.append(packMove(move))
+        self.stateLog.append(engine.stateLog[-1])
+        self.zobristLog.append(engine.zobristKey)
+        self.whiteToMove = engine.whiteToMove
+        self.fullmoveNumber = engine.fullmoveNumber
+        self.draw = False
+        scratch.engines[self.engineClass][2] = len(self.stateLog)     # the engine is in the new position already
+
+    '''
+    takes the last move back straight on the packed board, the same way GameState.undoMove does
+    '''
+
+    def undoMove(self):
+        if len(self.moveLog) == 0:
+            return
+        packed = self.moveLog.pop()
+        startSq = packed & 63
+        endSq = packed >> 6 & 63
+        pieceMoved = packed >> 14 & 15
+        board = self.board
+        board[startSq] = pieceMoved
+        if packed >> 22 & 1:            # en passant, the captured pawn was beside the start square
+            board[endSq] = 0
+            board[startSq & ~7 | endSq & 7] = packed >> 18 & 15
+        else:
+            board[endSq] = packed >> 18 & 15
+        if packed >> 23 & 1:            # castling, the rook goes back to its corner
+            if endSq & 7 == 6:
+                board[endSq + 1] = board[endSq - 1]
+                board[endSq - 1] = 0
+            else:
+                board[endSq - 2] = board[endSq + 1]
+                board[endSq + 1] = 0
+        self.stateLog.pop()
+        self.zobristLog.pop()
+        self.whiteToMove = not self.whiteToMove
+        if PIECES[pieceMoved][0] == 'b':
+            self.fullmoveNumber -= 1
+        self.checkMate = False
+        self.staleMate = False
+        self.draw = False
+
+    def toFen(self):
+        return self.getEngine().toFen()
+
+    '''
+    a full GameState of the game, history included, e.g. to search it or to write it as PGN. the moves are
+    played again from the starting position of the game
+    '''
+
+    def toGameState(self):
+        start = self.copy()
+        while len(start.moveLog):
+            start.undoMove()
+        gs = self.engineClass.fromFen(start.toFen())
+        for packed in self.moveLog:
+            promotionChoice = chess_engine.Move.promotionPieces[packed >> 12 & 3]
+            gs.makeMove(chess_engine.Move(chess_engine.squareCoordinates[packed & 63], chess_engine.squareCoordinates[packed >> 6 & 63],
+                                          gs.board, bool(packed >> 22 & 1), bool(packed >> 23 & 1), promotionChoice))
+        return gs
+
+
+class CompactBitboardGameState(CompactGameState):
+
+    __slots__ = ()
+
+    engineClass = bitboard_engine.BitboardGameState
@@ -0,0 +1,145 @@
+'''
+Differential check of the move generators. Plays random games from the perft positions with a reference
+generator and one or more candidates side by side, and at every position compares the valid moves of all of
+them, the position every move leads to, and the positions on the way back through undoMove. Stops at the first
+difference and prints the position so it can be fed to perft.py --fen ... --divide.
+
+    python movegen_diff.py                                  every generator against the reference
+    python movegen_diff.py --candidate bitboard --games 500
+    python movegen_diff.py --reference naive --games 20     against the original, slow generator
+'''
+
+import argparse
+import random
+import sys
+import time
+
+import bitboard_engine
+import chess_engine
+import perft
+
+# name: (GameState class, getValidMoves mode, attackMethod of the GameState or None)
+GENERATORS = {
+    "naive": (chess_engine.GameState, "naive", "moves"),       # the original generator
+    "outward": (chess_engine.GameState, "naive", "outward"),
+    "fast": (chess_engine.GameState, "fast", None),
+    "bitboard": (bitboard_engine.BitboardGameState, "bitboard", None),
+}
+
+
+class Divergence(Exception):
+    pass
+
+
+def newGameState(name, fen):
+    gameStateClass, mode, attackMethod = GENERATORS[name]
+    gs = gameStateClass.fromFen(fen)
+    if attackMethod is not None:
+        gs.attackMethod = attackMethod
+    return gs
+
+'''
+what has to be the same in two GameStates for them to be in the same position
+'''
+
+def getPositionInfo(gs):
+    return (gs.board, gs.whiteToMove, gs.zobristKey, gs.stateLog[-1], gs.materialScore, gs.positionScore,
+            gs.whiteKingLocation, gs.blackKingLocation, frozenset(gs.pieceSquares["w"]), frozenset(gs.pieceSquares["b"]))
+
+def getMoveInfo(move):
+    return (move.moveID, move.pieceMoved, move.pieceCaptured, move.isEnpassantMove, move.isCastleMove, move.isPawnPromotion)
+
+'''
+compares the valid moves of every GameState with those of the first one and the position after each move.
+returns the valid moves of every GameState, raises Divergence on the first difference
+'''
+
+def comparePosition(states, names):
+    allMoves = [gs.getValidMoves(GENERATORS[name][1]) for gs, name in zip(states, names)]
+    reference = {getMoveInfo(move) for move in allMoves[0]}
+    for gs, name, moves in zip(states[1:], names[1:], allMoves[1:]):
+        found = {getMoveInfo(move) for move in moves}
+        if found != reference or len(moves) != len(allMoves[0]):
+            missing = sorted(chess_engine.Move.getChessNotation(move) for move in allMoves[0] if getMoveInfo(move) not in found)
+            extra = sorted(chess_engine.Move.getChessNotation(move) for move in moves if getMoveInfo(move) not in reference)
+            raise Divergence(name + " valid moves differ in " + states[0].toFen() + "\n  missing: " + " ".join(missing) +
+                             "\n  extra: " + " ".join(extra) + ("\n  duplicates" if not missing and not extra else ""))
+        if (gs.checkMate, gs.staleMate, gs.draw) != (states[0].checkMate, states[0].staleMate, states[0].draw):
+            raise Divergence(name + " checkmate/stalemate/draw differs in " + states[0].toFen())
+
+    byID = [{move.moveID: move for move in moves} for moves in allMoves]
+    for move in allMoves[0]:
+        states[0].makeMove(move)
+        if states[0].pieceSquares != states[0].computePieceSquares():
+            raise Divergence("pieceSquares don't match the board after " + move.getChessNotation() + ", from " + states[0].toFen())
+        expected = getPositionInfo(states[0])
+        for gs, name, moves in zip(states[1:], names[1:], byID[1:]):
+            gs.makeMove(moves[move.moveID])
+            if getPositionInfo(gs) != expected:
+                raise Divergence(name + " position after " + move.getChessNotation() + " differs, from " +
+                                 gs.toFen() + " instead of " + states[0].toFen())
+            gs.undoMove()
+        states[0].undoMove()
+    return allMoves
+
+'''
+plays one random game of at most plies moves from fen with every generator, then takes it back again. counts
+the positions compared in stats["positions"]
+'''
+
+def walkGame(fen, names, plies, rng, stats):
+    states = [newGameState(name, fen) for name in names]
+    history = [getPositionInfo(states[0])]
+    copies = [[list(row) for row in states[0].board]]     # the board lists change in place, keep copies
+    for ply in range(plies):
+        allMoves = comparePosition(states, names)
+        stats["positions"] += 1
+        if len(allMoves[0]) == 0:
+            break
+        move = rng.choice(allMoves[0])
+        states[0].makeMove(move)
+        for gs, moves in zip(states[1:], allMoves[1:]):
+            gs.makeMove(next(other for other in moves if other.moveID == move.moveID))
+        history.append(getPositionInfo(states[0]))
+        copies.append([list(row) for row in states[0].board])
+    while states[0].moveLog:
+        history.pop()
+        copies.pop()
+        for gs, name in zip(states, names):
+            gs.undoMove()
+            if getPositionInfo(gs)[1:] != history[-1][1:] or gs.board != copies[-1]:
+                raise Divergence(name + " undoMove doesn't go back to " + states[0].toFen())
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="compare the move generators on random games")
+    parser.add_argument("--reference", choices=sorted(GENERATORS), default="outward")
+    parser.add_argument("--candidate", action="append", choices=sorted(GENERATORS),
+                        help="generator to check, can be given more than once, all the others if left out")
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--plies", type=int, default=60, help="maximum length of a random game")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--fen", help="start every game from this position instead of the perft positions")
+    options = parser.parse_args(args)
+
+    candidates = options.candidate or [name for name in GENERATORS if name not in (options.reference, "naive")]
+    names = [options.reference] + candidates
+    fens = [options.fen] if options.fen else [fen for fen, counts, depth in perft.POSITIONS.values()]
+    rng = random.Random(options.seed)
+
+    start = time.perf_counter()
+    stats = {"positions": 0}
+    try:
+        for game in range(options.games):
+            walkGame(fens[game % len(fens)], names, options.plies, rng, stats)
+    except Divergence as divergence:
+        print("DIVERGED after " + str(stats["positions"]) + " positions: " + str(divergence))
+        return 1
+    seconds = time.perf_counter() - start
+    print("%s against %s: %d games, %d positions, no differences, %.0f positions/s" % (
+        ", ".join(candidates), options.reference, options.games, stats["positions"], stats["positions"] / seconds))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+'''
+Opening book: the moves played in a collection of PGN games, looked up by the zobrist key of the position, so
+the AI can play the first moves of a game without searching.
+
+The book is a binary file of fixed size entries sorted by key: a header, then for every (position, move) the
+zobrist key (8 bytes), the moveID (2 bytes) and a weight (2 bytes). It is opened with mmap and searched in place
+with a binary search, so opening a book takes no time and no memory whatever its size, and a lookup reads a
+few dozen entries. A move gets 2 points for every game the side playing it won and 1 for every draw (or game
+without a result), moves only played by the losing side are left out.
+
+    python opening_book.py build games.pgn book.bin --plies 20
+    python opening_book.py probe book.bin --fen "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1"
+'''
+
+import argparse
+import mmap
+import random
+import struct
+import sys
+
+import bitboard_engine
+import chess_engine
+import pgn
+
+MAGIC = b"PYCBOOK1"     # changes with the format, and with the zobrist keys in chess_engine.py
+HEADER = struct.Struct("<8sI")      # magic, number of entries
+ENTRY = struct.Struct("<QHH")       # zobrist key, moveID, weight
+KEY = struct.Struct("<Q")
+BOOK_PLIES = 20         # moves further into a game than this aren't put in the book
+MAX_WEIGHT = 0xFFFF
+RESULT_POINTS = {"1-0": (2, 0), "0-1": (0, 2), "1/2-1/2": (1, 1)}     # (white, black), anything else counts as a draw
+
+
+'''
+{(zobrist key, moveID): weight} of the first plies moves of every game of games, as yielded by pgn.readGames.
+a game stops counting at its first move that can't be read or isn't legal. with a stats dict the games are
+counted in stats["games"], those left out for a bad FEN in stats["skipped"] and those cut short in
+stats["truncated"]
+'''
+
+def countBookMoves(games, plies=BOOK_PLIES, stats=None):
+    stats = stats if stats is not None else {}
+    stats.update(games=0, skipped=0, truncated=0)
+    weights = {}
+    for headers, sanMoves, result in games:
+        stats["games"] += 1
+        try:
+            gs = bitboard_engine.BitboardGameState.fromFen(headers["FEN"]) if "FEN" in headers else bitboard_engine.BitboardGameState()
+        except ValueError:
+            stats["skipped"] += 1
+            continue
+        points = RESULT_POINTS.get(result, (1, 1))
+        for san in sanMoves[:plies]:
+            try:
+                move = pgn.getMoveFromSan(gs, san, gs.getValidMoves())
+            except ValueError:
+                stats["truncated"] += 1
+                break
+            weight = points[0 if gs.whiteToMove else 1]
+            if weight:
+                entry = (gs.zobristKey, move.moveID)
+                weights[entry] = weights.get(entry, 0) + weight
+            gs.makeMove(move)
+    return weights
+
+'''
+writes the book file, sorted by key. weights are scaled down to fit in 16 bits when the largest doesn't, a
+move keeps a weight of at least 1. returns the number of entries
+'''
+
+def writeBook(path, weights):
+    largest = max(weights.values(), default=0)
+    scale = MAX_WEIGHT / largest if largest > MAX_WEIGHT else 1
+    entries = sorted(weights.items())
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, len(entries)))
+        for (key, moveID), weight in entries:
+            file.write(ENTRY.pack(key, moveID, max(1, int(weight * scale))))
+    return len(entries)
+
+def buildBook(pgnPath, bookPath, plies=BOOK_PLIES, stats=None):
+    with open(pgnPath) as file:
+        return writeBook(bookPath, countBookMoves(pgn.readGames(file), plies, stats))
+
+
+class OpeningBook:
+
+    '''
+    raises ValueError when the file isn't a book of this format
+    '''
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, self.entries = HEADER.unpack_from(self.data, 0) if len(self.data) >= HEADER.size else (None, 0)
+        except (ValueError, OSError):      # mmap refuses empty files
+            self.file.close()
+            raise ValueError("not an opening book: " + path)
+        if magic != MAGIC or len(self.data) != HEADER.size + self.entries * ENTRY.size:
+            self.close()
+            raise ValueError("not an opening book: " + path)
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    '''
+    (moveID, weight) of every book move of the position with the given zobrist key, an empty list when the
+    position isn't in the book
+    '''
+
+    def getMoves(self, key):
+        low = 0
+        high = self.entries
+        while low < high:       # first entry with a key that isn't smaller
+            middle = (low + high) // 2
+            if KEY.unpack_from(self.data, HEADER.size + middle * ENTRY.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        moves = []
+        for index in range(low, self.entries):
+            entryKey, moveID, weight = ENTRY.unpack_from(self.data, HEADER.size + index * ENTRY.size)
+            if entryKey != key:
+                break
+            moves.append((moveID, weight))
+        return moves
+
+    '''
+    a book move for gs picked at random by weight, None when the position isn't in the book. only moves that are
+    in validMoves can be picked, a different position with the same key can't make the AI play an illegal move
+    '''
+
+    def getMove(self, gs, validMoves, rng=random):
+        movesByID = {move.moveID: move for move in validMoves}
+        moves = []
+        weights = []
+        for moveID, weight in self.getMoves(gs.zobristKey):
+            if moveID in movesByID:
+                moves.append(movesByID[moveID])
+                weights.append(weight)
+        return rng.choices(moves, weights)[0] if moves else None
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="build and look into opening books")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="build a book from a PGN file")
+    build.add_argument("pgn")
+    build.add_argument("book")
+    build.add_argument("--plies", type=int, default=BOOK_PLIES, help="how many moves of every game go in the book")
+    probe = commands.add_parser("probe", help="print the book moves of a position")
+    probe.add_argument("book")
+    probe.add_argument("--fen", default=pgn.START_FEN)
+    options = parser.parse_args(args)
+
+    if options.command == "build":
+        stats = {}
+        entries = buildBook(options.pgn, options.book, options.plies, stats)
+        print("%d entries, %d bytes" % (entries, HEADER.size + entries * ENTRY.size))
+        print("%d games, %d skipped for a bad FEN, %d cut short at a move that couldn't be read" % (
+            stats["games"], stats["skipped"], stats["truncated"]))
+    else:
+        book = OpeningBook(options.book)
+        gs = chess_engine.GameState.fromFen(options.fen)
+        validMoves = gs.getValidMoves()
+        moves = {move.moveID: move for move in validMoves}
+        bookMoves = sorted(book.getMoves(gs.zobristKey), key=lambda entry: entry[1], reverse=True)
+        total = sum(weight for moveID, weight in bookMoves)
+        for moveID, weight in bookMoves:
+            san = pgn.getSan(gs, moves[moveID], validMoves) if moveID in moves else "(not legal here)"
+            print("%-8s %6d  %5.1f%%" % (san, weight, 100 * weight / total))
+        if not bookMoves:
+            print("not in the book")
+        book.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+'''
+Perft counts every leaf of the move tree to a given depth. The counts of the positions below are known,
+so a wrong count means the move generator is broken, and the time taken measures how fast it is.
+
+    python perft.py                              run the whole suite with the default depths
+    python perft.py --mode naive --depth 3       run it with the original generator, at most 3 plies deep
+    python perft.py --backend bitboard           run it on the BitboardGameState
+    python perft.py --position kiwipete          run a single position of the suite
+    python perft.py --fen "<fen>" --divide 3     print the node count below every move of a position
+    python perft.py --json perft_results.json    also write the results to a json file
+'''
+
+import argparse
+import json
+import sys
+import time
+
+import chess_engine
+import bitboard_engine
+
+# name: (fen, node counts for depth 1, 2, 3 ..., depth the suite runs by default)
+POSITIONS = {
+    "start": ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+              [20, 400, 8902, 197281, 4865609], 3),
+    "kiwipete": ("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+                 [48, 2039, 97862, 4085603], 2),
+    "position3": ("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+                  [14, 191, 2812, 43238, 674624], 4),
+    "position4": ("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+                  [6, 264, 9467, 422333], 3),
+    "position5": ("rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+                  [44, 1486, 62379, 2103487], 2),
+    "position6": ("r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+                  [46, 2079, 89890, 3894594], 2),
+    "illegal_ep_1": ("3k4/3p4/8/K1P4r/8/8/8/8 b - - 0 1",
+                     [18, 92, 1670, 10138, 185429, 1134888], 4),
+    "illegal_ep_2": ("8/8/4k3/8/2p5/8/B2P2K1/8 w - - 0 1",
+                     [13, 102, 1266, 10276, 135655, 1015133], 4),
+    "ep_gives_check": ("8/8/1k6/2b5/2pP4/8/5K2/8 b - d3 0 1",
+                       [15, 126, 1928, 13931, 206379, 1440467], 4),
+    "short_castle_check": ("5k2/8/8/8/8/8/8/4K2R w K - 0 1",
+                           [15, 66, 1198, 6399, 120330, 661072], 4),
+    "long_castle_check": ("3k4/8/8/8/8/8/8/R3K3 w Q - 0 1",
+                          [16, 71, 1286, 7418, 141077, 803711], 4),
+    "castle_rights": ("r3k2r/1b4bq/8/8/8/8/7B/R3K2R w KQkq - 0 1",
+                      [26, 1141, 27826, 1274206], 3),
+    "castle_prevented": ("r3k2r/8/3Q4/8/8/5q2/8/R3K2R b KQkq - 0 1",
+                         [44, 1494, 50509, 1720476], 2),
+    "promote_out_of_check": ("2K2r2/4P3/8/8/8/8/8/3k4 w - - 0 1",
+                             [11, 133, 1442, 19174, 266199, 3821001], 4),
+    "discovered_check": ("8/8/1P2K3/8/2n5/1q6/8/5k2 b - - 0 1",
+                         [29, 165, 5160, 31961, 1004658], 4),
+    "promote_give_check": ("4k3/1P6/8/8/8/8/K7/8 w - - 0 1",
+                           [9, 40, 472, 2661, 38983, 217342], 5),
+    "underpromote_check": ("8/P1k5/K7/8/8/8/8/8 w - - 0 1",
+                           [6, 27, 273, 1329, 18135, 92683], 5),
+    "self_stalemate": ("K1k5/8/P7/8/8/8/8/8 w - - 0 1",
+                       [2, 6, 13, 63, 382, 2217], 6),
+    "stalemate_checkmate_1": ("8/k1P5/8/1K6/8/8/8/8 w - - 0 1",
+                              [10, 25, 268, 926, 10857, 43261, 567584], 5),
+    "stalemate_checkmate_2": ("8/8/2k5/5q2/5n2/8/5K2/8 b - - 0 1",
+                              [37, 183, 6559, 23527, 811573], 4),
+}
+
+BACKENDS = {"mailbox": chess_engine.GameState, "bitboard": bitboard_engine.BitboardGameState}
+
+
+'''
+number of leaf nodes of the move tree, depth plies deep
+'''
+
+def perft(gs, depth, mode):
+    moves = gs.getValidMoves(mode)
+    if depth == 1:
+        return len(moves)   # bulk counting, the last ply is not played out
+    nodes = 0
+    for move in moves:
+        gs.makeMove(move)
+        nodes += perft(gs, depth - 1, mode)
+        gs.undoMove()
+    return nodes
+
+
+'''
+perft split by the first move, the first thing to look at when a count is wrong
+'''
+
+def divide(gs, depth, mode):
+    counts = {}
+    for move in gs.getValidMoves(mode):
+        gs.makeMove(move)
+        counts[move.getChessNotation()] = perft(gs, depth - 1, mode) if depth > 1 else 1
+        gs.undoMove()
+    return counts
+
+
+'''
+runs perft on one position for every depth up to maxDepth and returns a result per depth
+'''
+
+def runPosition(name, fen, expectedCounts, maxDepth, backend, mode):
+    results = []
+    for depth in range(1, maxDepth + 1):
+        gs = BACKENDS[backend].fromFen(fen)
+        start = time.perf_counter()
+        nodes = perft(gs, depth, mode)
+        seconds = time.perf_counter() - start
+        expected = expectedCounts[depth - 1] if depth <= len(expectedCounts) else None
+        results.append({"position": name, "depth": depth, "nodes": nodes, "expected": expected,
+                        "ok": expected is None or nodes == expected, "seconds": seconds,
+                        "nodesPerSecond": nodes / seconds if seconds > 0 else 0.0})
+        print("%-22s depth %d  %9d nodes  %8.3f s  %9.0f nodes/s  %s" % (
+            name, depth, nodes, seconds, results[-1]["nodesPerSecond"],
+            "ok" if expected is None or nodes == expected else "FAILED (expected %d)" % expected))
+    return results
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="perft correctness and speed suite for the move generators")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="mailbox")
+    parser.add_argument("--mode", default=None, help="getValidMoves mode, the backend's default if left out")
+    parser.add_argument("--position", choices=sorted(POSITIONS), help="only run this position of the suite")
+    parser.add_argument("--fen", help="run a position that is not in the suite")
+    parser.add_argument("--depth", type=int, help="maximum depth, the suite's own depths if left out")
+    parser.add_argument("--divide", type=int, metavar="DEPTH", help="print the count below every move instead")
+    parser.add_argument("--json", metavar="FILE", help="write the results to this json file")
+    options = parser.parse_args(args)
+    mode = options.mode or ("bitboard" if options.backend == "bitboard" else "naive")
+
+    if options.divide:
+        fen = options.fen or POSITIONS[options.position or "start"][0]
+        counts = divide(BACKENDS[options.backend].fromFen(fen), options.divide, mode)
+        for notation in sorted(counts):
+            print(notation + ": " + str(counts[notation]))
+        print("Moves: " + str(len(counts)) + "  Nodes: " + str(sum(counts.values())))
+        return 0
+
+    if options.fen:
+        suite = {"fen": (options.fen, [], options.depth or 3)}
+    elif options.position:
+        suite = {options.position: POSITIONS[options.position]}
+    else:
+        suite = POSITIONS
+
+    results = []
+    for name, (fen, expectedCounts, defaultDepth) in suite.items():
+        results += runPosition(name, fen, expectedCounts, options.depth or defaultDepth, options.backend, mode)
+
+    totalNodes = sum(result["nodes"] for result in results)
+    totalSeconds = sum(result["seconds"] for result in results)
+    failures = [result for result in results if not result["ok"]]
+    print("Total: %d nodes in %.3f s, %.0f nodes/s, %d failed" % (
+        totalNodes, totalSeconds, totalNodes / totalSeconds if totalSeconds > 0 else 0.0, len(failures)))
+
+    if options.json:
+        with open(options.json, "w") as file:
+            json.dump({"backend": options.backend, "mode": mode, "totalNodes": totalNodes,
+                       "totalSeconds": totalSeconds, "failed": len(failures), "results": results}, file, indent=2)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+'''
+PGN (portable game notation) support: moves in standard algebraic notation (SAN) and whole games as PGN text.
+
+Reading is streamed: readGames() goes through a file line by line and yields one game at a time, so a file of
+any size takes the memory of a single game. replayGame() plays the moves of a game into a GameState.
+
+    with open("games.pgn") as file:
+        for headers, sanMoves, result in pgn.readGames(file):
+            gs = pgn.replayGame(headers, sanMoves)
+'''
+
+import re
+
+import bitboard_engine
+import chess_engine
+
+SEVEN_TAG_ROSTER = ("Event", "Site", "Date", "Round", "White", "Black", "Result")
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+TAG = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+TOKEN = re.compile(r'[{}();]|[^\s{}();]+')
+MOVE_NUMBER = re.compile(r'^\d+\.+')    # the dots are needed, 0-0 is castling
+ESCAPE = re.compile(r'\\(.)')
+
+
+'''
+the SAN of a move in the position of gs, before the move is made. validMoves are the valid moves of that
+position, they are needed to tell apart two pieces of the same kind that can go to the same square
+'''
+
+def getSan(gs, move, validMoves):
+    if move.isCastleMove:
+        san = "O-O" if move.endCol - move.startCol == 2 else "O-O-O"
+    else:
+        endSquare = move.getRankFile(move.endRow, move.endCol)
+        piece = move.pieceMoved[1]
+        if piece == "p":
+            san = chess_engine.Move.colsToFiles[move.startCol] + "x" + endSquare if move.pieceCaptured != "--" else endSquare
+            if move.isPawnPromotion:
+                san += "=" + move.promotionChoice
+        else:
+            san = piece
+            others = [other for other in validMoves if other.pieceMoved == move.pieceMoved and other.endRow == move.endRow
+                      and other.endCol == move.endCol and (other.startRow, other.startCol) != (move.startRow, move.startCol)]
+            if others:
+                if all(other.startCol != move.startCol for other in others):
+                    san += chess_engine.Move.colsToFiles[move.startCol]
+                elif all(other.startRow != move.startRow for other in others):
+                    san += chess_engine.Move.rowsToRanks[move.startRow]
+                else:
+                    san += move.getRankFile(move.startRow, move.startCol)
+            if move.pieceCaptured != "--":
+                san += "x"
+            san += endSquare
+    gs.makeMove(move)
+    if gs.inCheck():
+        san += "#" if len(gs.getValidMoves()) == 0 else "+"
+    gs.undoMove()
+    return san
+
+'''
+the valid move a SAN string stands for in the position of gs. check marks and annotations (+, #, !, ?) and an
+"e.p." are ignored, a promotion may be written without "=" (e8Q) and in lower case. raises ValueError when no
+valid move or more than one fits
+'''
+
+def getMoveFromSan(gs, san, validMoves):
+    text = san.rstrip("+#!?")
+    if text.endswith("e.p."):
+        text = text[:-4]
+    if text in ("O-O", "O-O-O", "0-0", "0-0-0"):
+        kingside = len(text) == 3
+        for move in validMoves:
+            if move.isCastleMove and (move.endCol - move.startCol == 2) == kingside:
+                return move
+        raise ValueError("illegal move " + san + " in " + gs.toFen())
+
+    promotion = None
+    if "=" in text:
+        text, promotion = text.split("=", 1)
+        promotion = promotion.upper()
+    elif len(text) >= 3 and text[-1] in "QRBNqrbn" and text[-2] in chess_engine.Move.ranksToRows:
+        promotion = text[-1].upper()
+        text = text[:-1]
+    piece = "p"
+    if text and text[0] in "KQRBN":
+        piece = text[0]
+        text = text[1:]
+    text = text.replace("x", "")
+    if len(text) < 2 or text[-2] not in chess_engine.Move.filesToCols or text[-1] not in chess_engine.Move.ranksToRows:
+        raise ValueError("can't read move " + san)
+    endRow = chess_engine.Move.ranksToRows[text[-1]]
+    endCol = chess_engine.Move.filesToCols[text[-2]]
+    startRow = startCol = None      # the start file and/or rank given to tell two pieces apart
+    for char in text[:-2]:
+        if char in chess_engine.Move.filesToCols:
+            startCol = chess_engine.Move.filesToCols[char]
+        elif char in chess_engine.Move.ranksToRows:
+            startRow = chess_engine.Move.ranksToRows[char]
+        else:
+            raise ValueError("can't read move " + san)
+
+    found = None
+    for move in validMoves:
+        if move.pieceMoved[1] != piece or move.endRow != endRow or move.endCol != endCol:
+            continue
+        if move.isPawnPromotion and move.promotionChoice != promotion:
+            continue
+        if (startCol is not None and move.startCol != startCol) or (startRow is not None and move.startRow != startRow):
+            continue
+        if found is not None:
+            raise ValueError("ambiguous move " + san + " in " + gs.toFen())
+        found = move
+    if found is None:
+        raise ValueError("illegal move " + san + " in " + gs.toFen())
+    return found
+
+'''
+the moves of a game as numbered SAN movetext ending in the result and wrapped at 80 characters. the game starts
+from fen, or from the starting position when there is no fen
+'''
+
+def getMovetext(moves, result, fen=None):
+    gs = bitboard_engine.BitboardGameState.fromFen(fen) if fen else bitboard_engine.BitboardGameState()
+    tokens = []
+    for move in moves:
+        if gs.whiteToMove:
+            tokens.append(str(gs.fullmoveNumber) + ".")
+        elif not tokens:        # a game starting with a black move
+            tokens.append(str(gs.fullmoveNumber) + "...")
+        tokens.append(getSan(gs, move, gs.getValidMoves()))
+        gs.makeMove(move)
+    tokens.append(result)
+
+    lines = []
+    line = ""
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > 80:
+            lines.append(line)
+            line = token
+        else:
+            line = line + " " + token if line else token
+    lines.append(line)
+    return "\n".join(lines)
+
+'''
+a whole game as PGN text. headers is a dict of tag names and values, the seven tag roster comes first in its
+own order and any tags that are missing from it are written as "?"
+'''
+
+def formatGame(headers, moves, result="*"):
+    headers = dict(headers, Result=result)
+    tags = list(SEVEN_TAG_ROSTER) + [name for name in headers if name not in SEVEN_TAG_ROSTER]
+    lines = ['[' + name + ' "' + str(headers.get(name, "?")).replace("\\", "\\\\").replace('"', '\\"') + '"]' for name in tags]
+    return "\n".join(lines) + "\n\n" + getMovetext(moves, result, headers.get("FEN")) + "\n"
+
+'''
+the game played in gs (its moveLog) as PGN text. a game that didn't start from the starting position gets the
+SetUp and FEN tags
+'''
+
+def formatGameState(gs, headers, result="*"):
+    moves = list(gs.moveLog)
+    for move in moves:
+        gs.undoMove()
+    startFen = gs.toFen()
+    for move in moves:
+        gs.makeMove(move)
+    if startFen != START_FEN:
+        headers = dict(headers, SetUp="1", FEN=startFen)
+    return formatGame(headers, moves, result)
+
+'''
+yields (headers, sanMoves, result) for every game of a PGN file, reading it one line at a time. comments,
+variations and numeric annotations are skipped. a game without a result at the end gets the one of its
+Result tag, or "*"
+'''
+
+def readGames(file):
+    headers = {}
+    sanMoves = []
+    inComment = False
+    variationDepth = 0
+    for line in file:
+        if not inComment and variationDepth == 0 and line.startswith("["):
+            if sanMoves:       # the previous game had no result at the end
+                yield headers, sanMoves, headers.get("Result", "*")
+                headers = {}
+                sanMoves = []
+            tag = TAG.match(line)
+            if tag:
+                headers[tag.group(1)] = ESCAPE.sub(r"\1", tag.group(2))
+            continue
+        if line.startswith("%"):        # escaped line
+            continue
+        for token in TOKEN.findall(line):
+            if inComment:
+                inComment = token != "}"
+            elif token == "{":
+                inComment = True
+            elif token == ";":          # comment to the end of the line
+                break
+            elif token == "(":
+                variationDepth += 1
+            elif token == ")":
+                variationDepth -= 1
+            elif variationDepth > 0 or token[0] == "$" or token == "e.p." or token.isdigit():
+                continue
+            elif token in RESULTS:
+                yield headers, sanMoves, token
+                headers = {}
+                sanMoves = []
+            else:
+                token = MOVE_NUMBER.sub("", token)      # 12. or 12... glued to the move, a bare 12 is skipped above
+                if token:
+                    sanMoves.append(token)
+    if sanMoves or headers:
+        yield headers, sanMoves, headers.get("Result", "*")
+
+'''
+plays the moves of a game read by readGames into a new GameState of gameStateClass (from the FEN tag if there
+is one) and returns it. raises ValueError on a move that isn't legal
+'''
+
+def replayGame(headers, sanMoves, gameStateClass=bitboard_engine.BitboardGameState):
+    gs = gameStateClass.fromFen(headers["FEN"]) if "FEN" in headers else gameStateClass()
+    for san in sanMoves:
+        gs.makeMove(getMoveFromSan(gs, san, gs.getValidMoves()))
+    return gs
@@ -0,0 +1,86 @@
+'''
+What a search did: nodes, transposition table hits, cutoffs, time, and optionally how that time was spent
+between move generation, making moves and scoring boards. SmartMoveFinder fills one in for every search.
+'''
+
+import functools
+import time
+
+
+class SearchStats:
+
+    def __init__(self):
+        self.depth = 0                  # deepest depth that was searched completely
+        self.nodes = 0                  # nodes of the main search
+        self.quiescenceNodes = 0
+        self.ttProbes = 0
+        self.ttHits = 0
+        self.ttMisses = 0
+        self.ttCollisions = 0           # misses on a bucket full of other positions
+        self.betaCutoffs = 0
+        self.firstMoveCutoffs = 0       # beta cutoffs on the first move searched, a measure of the move ordering
+        self.researches = 0             # moves searched again after beating the null window of PVS
+        self.aspirationResearches = 0   # root searches done again after falling outside the aspiration window
+        self.nullMoveCutoffs = 0
+        self.reductionResearches = 0    # late moves searched again to the full depth after beating alpha reduced
+        self.seconds = 0.0
+        self.phaseSeconds = {}          # name of a phase: seconds, only filled when the phases are timed
+        self.iterations = []            # per completed depth: depth, nodes, quiescenceNodes, seconds, score, move
+        self.startTime = time.perf_counter()
+
+    def getNodesPerSecond(self):
+        return (self.nodes + self.quiescenceNodes) / self.seconds if self.seconds > 0 else 0.0
+
+    def getFirstMoveCutoffRate(self):
+        return self.firstMoveCutoffs / self.betaCutoffs if self.betaCutoffs else 0.0
+
+    '''
+    how many moves per position the search really looks at: the growth of the node count from one depth to the
+    next, or the depth-th root of the node count when there was only one depth
+    '''
+
+    def getEffectiveBranchingFactor(self):
+        if len(self.iterations) >= 2 and self.iterations[-2]["nodes"]:
+            return self.iterations[-1]["nodes"] / self.iterations[-2]["nodes"]
+        if self.depth and self.nodes:
+            return self.nodes ** (1 / self.depth)
+        return 0.0
+
+    def getText(self):
+        text = "Depth: " + str(self.depth) + " nodes: " + str(self.nodes) + " quiescence: " + str(self.quiescenceNodes) + \
+               " time: " + str(round(self.seconds, 3)) + " nodes/s: " + str(round(self.getNodesPerSecond())) + \
+               " EBF: " + str(round(self.getEffectiveBranchingFactor(), 2)) + " cutoffs: " + str(self.betaCutoffs) + \
+               " first move: " + str(round(100 * self.getFirstMoveCutoffRate(), 1)) + "%" + \
+               " TT hits: " + str(self.ttHits) + "/" + str(self.ttProbes) + " misses: " + str(self.ttMisses) + \
+               " collisions: " + str(self.ttCollisions) + \
+               " re-searches: " + str(self.researches) + " PVS, " + str(self.aspirationResearches) + " aspiration, " + \
+               str(self.reductionResearches) + " LMR, null move cutoffs: " + str(self.nullMoveCutoffs)
+        if self.phaseSeconds:
+            text += " phases: " + ", ".join(name + " " + str(round(seconds, 3)) + "s" for name, seconds in self.phaseSeconds.items())
+        return text
+
+
+'''
+Times phases of the search by wrapping the functions that run them. a phase called from inside another one
+(makeMove inside getValidMoves) is counted as part of the outer one, so the phase times add up
+'''
+
+class PhaseTimer:
+
+    def __init__(self, phaseSeconds):
+        self.phaseSeconds = phaseSeconds
+        self.running = False
+
+    def wrap(self, name, function):
+        @functools.wraps(function)
+        def timedFunction(*args, **kwargs):
+            if self.running:
+                return function(*args, **kwargs)
+            self.running = True
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.phaseSeconds[name] = self.phaseSeconds.get(name, 0.0) + time.perf_counter() - start
+                self.running = False
+        return timedFunction
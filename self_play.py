@@ -0,0 +1,192 @@
+'''
+Plays the AI against itself without a window, many games at once on a pool of processes, to see whether a
+change to the search or the evaluation makes it stronger. Engine A and engine B can search to a different
+depth or for a different time. Every opening (a few random moves) is played twice, once with A as white and
+once with B as white.
+
+    python self_play.py --games 20 --depth-a 3 --depth-b 2
+    python self_play.py --games 100 --time-a 200 --time-b 200 --random-plies 6 --pgn games.pgn
+    python self_play.py --games 8 --workers 4 --json results.json
+    python self_play.py --games 20 --book book.bin --random-plies 0     both engines play book moves while they can
+'''
+
+import argparse
+import concurrent.futures
+import contextlib
+import datetime
+import io
+import json
+import os
+import random
+import sys
+import time
+
+import SmartMoveFinder
+import opening_book
+import pgn
+import perft
+from transposition_table import TranspositionTable
+
+MAX_PLIES = 300     # a game that goes on longer than this is called a draw
+
+
+'''
+name of an engine in the results and the PGN
+'''
+
+def getEngineName(label, depth, timeMs):
+    return label + " (" + ("depth " + str(depth) if timeMs is None else str(timeMs) + " ms") + ")"
+
+'''
+plays one game and returns its result. runs in a worker process. games 2k and 2k + 1 share their random
+opening and swap colours, even games have engine A as white. with a bookPath the engines play moves from that
+opening book while there are any, picked the same way in both games of a pair
+'''
+
+def playGame(index, engines, randomPlies, maxPlies, seed, backend, bookPath=None):
+    openingRandom = random.Random(seed + index // 2)
+    random.seed(seed + index)       # the searches shuffle the root moves
+    sides = engines if index % 2 == 0 else engines[::-1]     # white, black
+    tables = [TranspositionTable(SmartMoveFinder.TT_SIZE_MB) for side in sides]     # no sharing what they found
+    stats = [{"nodes": 0, "seconds": 0.0, "moves": 0} for side in sides]
+
+    gs = perft.BACKENDS[backend]()
+    validMoves = gs.getValidMoves()
+    for ply in range(randomPlies):
+        if len(validMoves) == 0:
+            break
+        gs.makeMove(openingRandom.choice(validMoves))
+        validMoves = gs.getValidMoves()
+    book = opening_book.OpeningBook(bookPath) if bookPath else None
+
+    while True:
+        if gs.checkMate:
+            result, termination = ("0-1" if gs.whiteToMove else "1-0"), "checkmate"
+            break
+        elif gs.staleMate:
+            result, termination = "1/2-1/2", "stalemate"
+            break
+        elif gs.draw:
+            result, termination = "1/2-1/2", gs.getDrawReason()
+            break
+        elif len(gs.moveLog) >= maxPlies:
+            result, termination = "1/2-1/2", "move limit"
+            break
+        turn = 0 if gs.whiteToMove else 1
+        engine = sides[turn]
+        SmartMoveFinder.transpositionTable = tables[turn]
+        move = book.getMove(gs, validMoves, openingRandom) if book is not None else None
+        if move is None:
+            if book is not None:    # out of the book for good
+                book.close()
+                book = None
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):     # the search prints its statistics every move
+                move = SmartMoveFinder.findBestMoveIterative(gs, validMoves, timeLimitMs=engine["timeMs"],
+                                                             maxDepth=engine["depth"])
+            stats[turn]["seconds"] += time.perf_counter() - start
+            stats[turn]["nodes"] += SmartMoveFinder.counter + SmartMoveFinder.quiescenceCounter
+            stats[turn]["moves"] += 1
+        gs.makeMove(move)
+        validMoves = gs.getValidMoves()
+    if book is not None:
+        book.close()
+
+    return {"index": index, "white": sides[0]["name"], "black": sides[1]["name"], "result": result,
+            "termination": termination, "plies": len(gs.moveLog), "stats": dict(zip((sides[0]["name"], sides[1]["name"]), stats)),
+            "moves": [(move.startRow, move.startCol, move.endRow, move.endCol, move.promotionChoice) for move in gs.moveLog]}
+
+'''
+W/D/L from engine A's point of view, and nodes per second and time per move of both engines
+'''
+
+def summarize(games, engines):
+    a = engines[0]["name"]
+    summary = {"games": len(games), "wins": 0, "draws": 0, "losses": 0, "engines": {}}
+    for game in games:
+        if game["result"] == "1/2-1/2":
+            summary["draws"] += 1
+        elif (game["result"] == "1-0") == (game["white"] == a):
+            summary["wins"] += 1
+        else:
+            summary["losses"] += 1
+    for engine in engines:
+        nodes = sum(game["stats"][engine["name"]]["nodes"] for game in games)
+        seconds = sum(game["stats"][engine["name"]]["seconds"] for game in games)
+        moves = sum(game["stats"][engine["name"]]["moves"] for game in games)
+        summary["engines"][engine["name"]] = {"nodesPerSecond": nodes / seconds if seconds > 0 else 0.0,
+                                              "secondsPerMove": seconds / moves if moves else 0.0}
+    return summary
+
+'''
+the games as PGN text, one after the other
+'''
+
+def getPgnText(games, date):
+    texts = []
+    for game in games:
+        moves = []
+        gs = perft.BACKENDS["mailbox"]()
+        for startRow, startCol, endRow, endCol, promotionChoice in game["moves"]:
+            move = next(move for move in gs.getValidMoves() if (move.startRow, move.startCol, move.endRow, move.endCol,
+                                                                 move.promotionChoice) == (startRow, startCol, endRow, endCol, promotionChoice))
+            gs.makeMove(move)
+            moves.append(move)
+        headers = {"Event": "Self play", "Site": "?", "Date": date, "Round": game["index"] + 1,
+                   "White": game["white"], "Black": game["black"], "Termination": game["termination"]}
+        texts.append(pgn.formatGame(headers, moves, game["result"]))
+    return "\n".join(texts)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="headless self play between two settings of the AI")
+    parser.add_argument("--games", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--depth-a", type=int, default=SmartMoveFinder.DEPTH, help="search depth of engine A")
+    parser.add_argument("--depth-b", type=int, default=SmartMoveFinder.DEPTH, help="search depth of engine B")
+    parser.add_argument("--time-a", type=int, help="milliseconds per move of engine A, searches to --depth-a if left out")
+    parser.add_argument("--time-b", type=int, help="milliseconds per move of engine B")
+    parser.add_argument("--random-plies", type=int, default=4, help="random moves at the start of every opening")
+    parser.add_argument("--max-plies", type=int, default=MAX_PLIES)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--backend", choices=sorted(perft.BACKENDS), default="mailbox")
+    parser.add_argument("--book", metavar="FILE", help="opening book (see opening_book.py) both engines play from")
+    parser.add_argument("--pgn", metavar="FILE", help="write the games to this PGN file")
+    parser.add_argument("--json", metavar="FILE", help="write the results to this json file")
+    options = parser.parse_args(args)
+
+    engines = []
+    for label, depth, timeMs in (("A", options.depth_a, options.time_a), ("B", options.depth_b, options.time_b)):
+        engines.append({"name": getEngineName(label, depth, timeMs), "depth": depth if timeMs is None else SmartMoveFinder.MAX_DEPTH,
+                        "timeMs": timeMs})
+
+    start = time.perf_counter()
+    games = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=options.workers) as pool:
+        futures = [pool.submit(playGame, index, engines, options.random_plies, options.max_plies, options.seed, options.backend,
+                               options.book) for index in range(options.games)]
+        for future in concurrent.futures.as_completed(futures):
+            game = future.result()
+            games.append(game)
+            print("game %3d  %-18s - %-18s  %-7s  %3d plies  %s" % (
+                game["index"] + 1, game["white"], game["black"], game["result"], game["plies"], game["termination"]))
+    games.sort(key=lambda game: game["index"])
+
+    summary = summarize(games, engines)
+    summary["seconds"] = time.perf_counter() - start
+    print("%s against %s: +%d =%d -%d in %.1f s" % (engines[0]["name"], engines[1]["name"], summary["wins"],
+                                                   summary["draws"], summary["losses"], summary["seconds"]))
+    for name, engineSummary in summary["engines"].items():
+        print("%-18s %9.0f nodes/s  %7.3f s per move" % (name, engineSummary["nodesPerSecond"], engineSummary["secondsPerMove"]))
+
+    if options.pgn:
+        with open(options.pgn, "w") as file:
+            file.write(getPgnText(games, datetime.date.today().strftime("%Y.%m.%d")))
+    if options.json:
+        with open(options.json, "w") as file:
+            json.dump({"summary": summary, "games": [dict(game, moves=None) for game in games]}, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
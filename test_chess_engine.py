@@ -0,0 +1,51 @@
+'''
+Checks of GameState.fromFen. run with python -m unittest
+'''
+
+import unittest
+
+import bitboard_engine
+import chess_engine
+
+KIWIPETE = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+
+
+class FromFenTest(unittest.TestCase):
+
+    def testRoundTrip(self):
+        for gameStateClass in (chess_engine.GameState, bitboard_engine.BitboardGameState):
+            self.assertEqual(gameStateClass.fromFen(KIWIPETE).toFen(), KIWIPETE)
+
+    def testKingLocations(self):
+        gs = chess_engine.GameState.fromFen("8/8/8/4k3/8/8/8/R3K3 w - - 0 1")
+        self.assertEqual(gs.whiteKingLocation, (7, 4))
+        self.assertEqual(gs.blackKingLocation, (3, 4))
+
+    def testMalformed(self):
+        for fen in ("8/8/8/8/8/8/8/8 w - - 0 1",                  # no kings at all
+                    "8/8/8/8/8/8/8/4K3 w - - 0 1",                # no black king
+                    "4k3/8/8/8/8/8/8/8 b - - 0 1",                # no white king
+                    "4k3/8/8/8/8/8/8/3KK3 w - - 0 1",             # two white kings
+                    "4k3/8/8/8/8/8/8/4K3 x - - 0 1",
+                    "4k3/8/8/8/8/8/8/4K2 w - - 0 1",
+                    "4k3/8/8/8/8/8/4K3 w - - 0 1",
+                    "4k3/8/8/8/8/8/8/4X3 w - - 0 1",
+                    "4k3/8/8/8/8/8/8/4K3 w - e5 0 1",
+                    "4k3/8/8/8/8/8/8/4K3 w -",
+                    "8/3k4/8/8/8/8/8/R3K2R w -KQ - 0 1",           # castling rights must be "-" or in KQkq order
+                    "8/3k4/8/8/8/8/8/R3K2R w KK - 0 1",
+                    "8/3k4/8/8/8/8/8/R3K2R w QK - 0 1",
+                    "8/3k4/8/8/8/8/8/R3K2R w K- - 0 1",
+                    "4k3/8/8/8/8/8/8/7K w K - 0 1",               # castling right without the king on e1
+                    "4k3/8/8/8/8/8/8/4K3 w K - 0 1",              # castling right without the rook on h1
+                    "4k3/8/8/8/8/8/3P4/4K3 w - e3 0 1",           # en passant square on the mover's side
+                    "4k3/8/8/8/8/8/8/4K3 w - e6 0 1",             # en passant square without the pawn that skipped it
+                    "4kP2/8/8/8/8/8/8/4K3 w - - 0 1",             # pawn on the back rank
+                    "3Rk3/8/8/8/8/8/8/4K3 w - - 0 1"):            # the side not to move is in check
+            with self.subTest(fen=fen):
+                with self.assertRaises(ValueError):
+                    chess_engine.GameState.fromFen(fen)
+
+
+if __name__ == "__main__":
+    unittest.main()
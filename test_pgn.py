@@ -0,0 +1,72 @@
+'''
+Checks of reading PGN written by other programs: castling with zeros, promotions without "=", comments, NAGs,
+variations and "e.p.". run with python -m unittest
+'''
+
+import io
+import unittest
+
+import chess_engine
+import pgn
+
+PGN_TEXT = """[Event "Zero castling"]
+[Result "1/2-1/2"]
+
+1. d4 d5 2. Nf3 Nc6 3. Bf4 {a comment
+over two lines} Bf5 $1 4. e3 (4. Nc3 e6 (4... Nf6) 5. e3) 4... Qd7 5. Be2 0-0-0 ; the rest of the line
+6. 0-0 e6 1/2-1/2
+
+[Event "Promotions"]
+[FEN "8/P6k/8/8/8/8/6Kp/8 w - - 0 1"]
+[Result "*"]
+
+1. a8Q h1n+ 2. Kxh1 *
+
+[Event "En passant"]
+[Result "*"]
+
+1. e4 a6 2. e5 d5 3. exd6 e.p. *
+"""
+
+
+class ReadGamesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.games = list(pgn.readGames(io.StringIO(PGN_TEXT)))
+
+    def testMovesAndResults(self):
+        self.assertEqual([result for headers, sanMoves, result in self.games], ["1/2-1/2", "*", "*"])
+        self.assertEqual(self.games[0][1], ["d4", "d5", "Nf3", "Nc6", "Bf4", "Bf5", "e3", "Qd7", "Be2", "0-0-0", "0-0", "e6"])
+        self.assertEqual(self.games[1][1], ["a8Q", "h1n+", "Kxh1"])
+        self.assertEqual(self.games[2][1], ["e4", "a6", "e5", "d5", "exd6"])
+
+    def testReplay(self):
+        fens = [pgn.replayGame(headers, sanMoves).toFen() for headers, sanMoves, result in self.games]
+        self.assertEqual(fens, ["2kr1bnr/pppq1ppp/2n1p3/3p1b2/3P1B2/4PN2/PPP1BPPP/RN1Q1RK1 w - - 0 7",
+                                "Q7/7k/8/8/8/8/8/7K b - - 0 2",
+                                "rnbqkbnr/1pp1pppp/p2P4/8/8/8/PPPP1PPP/RNBQKBNR b KQkq - 0 3"])
+
+
+class GetMoveFromSanTest(unittest.TestCase):
+
+    def getMove(self, fen, san):
+        gs = chess_engine.GameState.fromFen(fen)
+        return pgn.getMoveFromSan(gs, san, gs.getValidMoves())
+
+    def testPromotions(self):
+        fen = "8/4P2k/8/8/8/8/8/K7 w - - 0 1"
+        for san, piece in (("e8=Q", "Q"), ("e8Q", "Q"), ("e8N+", "N"), ("e8=r", "R"), ("e8b", "B")):
+            with self.subTest(san=san):
+                self.assertEqual(self.getMove(fen, san).promotionChoice, piece)
+
+    def testEnpassantSuffix(self):
+        move = self.getMove("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1", "exd6e.p.")
+        self.assertTrue(move.isEnpassantMove)
+
+    def testUnreadable(self):
+        with self.assertRaises(ValueError):
+            self.getMove(chess_engine.GameState().toFen(), "-0")
+
+
+if __name__ == "__main__":
+    unittest.main()
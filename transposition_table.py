@@ -0,0 +1,75 @@
+'''
+A transposition table remembers what the search found out about a position (keyed by its zobrist key) so the
+same position reached through a different move order doesn't have to be searched again.
+
+The table is three flat arrays instead of a dict of objects: the keys, the centipawn scores and a packed word
+holding depth, bound type and best move. Entries come in buckets of two slots: the first keeps the deepest search
+seen for its bucket, the second always takes the newest entry.
+'''
+
+from array import array
+
+EXACT = 1           # the score is the exact value of the position
+LOWER_BOUND = 2     # the search failed high, the real value is at least the score
+UPPER_BOUND = 3     # the search failed low, the real value is at most the score
+
+BYTES_PER_SLOT = 8 + 4 + 8      # 64 bit key, 32 bit score and 64 bit packed info
+
+
+class TranspositionTable:
+
+    def __init__(self, sizeMB=16):
+        self.buckets = max(1, int(sizeMB * 1024 * 1024) // (2 * BYTES_PER_SLOT))
+        self.keys = array('Q', [0]) * (2 * self.buckets)
+        self.scores = array('i', [0]) * (2 * self.buckets)
+        self.info = array('Q', [0]) * (2 * self.buckets)    # depth | bound << 8 | moveID << 10, 0 when empty
+        self.resetStats()
+
+    def resetStats(self):
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0     # the bucket was full of other positions
+        self.stores = 0
+
+    def clear(self):
+        for i in range(len(self.info)):
+            self.keys[i] = 0
+            self.info[i] = 0
+        self.resetStats()
+
+    '''
+    returns (depth, bound, score, moveID) stored for the key, or None
+    '''
+
+    def probe(self, key):
+        slot = (key % self.buckets) * 2
+        for i in (slot, slot + 1):
+            if self.keys[i] == key and self.info[i]:
+                self.hits += 1
+                info = self.info[i]
+                return info & 255, (info >> 8) & 3, self.scores[i], info >> 10
+        self.misses += 1
+        if self.info[slot] and self.info[slot + 1]:
+            self.collisions += 1
+        return None
+
+    '''
+    store a search result. moveID is the best move found (0 if none), depth the remaining search depth
+    '''
+
+    def store(self, key, depth, bound, score, moveID):
+        slot = (key % self.buckets) * 2
+        info = self.info[slot]
+        # depth preferred slot: take it when empty, for the same position, or for a search at least as deep
+        if not info or self.keys[slot] == key or depth >= info & 255:
+            if self.keys[slot] != key and info:
+                # the position pushed out still gets the always replace slot
+                self.keys[slot + 1] = self.keys[slot]
+                self.scores[slot + 1] = self.scores[slot]
+                self.info[slot + 1] = info
+        else:
+            slot += 1
+        self.keys[slot] = key
+        self.scores[slot] = score
+        self.info[slot] = depth | bound << 8 | moveID << 10
+        self.stores += 1